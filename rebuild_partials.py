@@ -224,11 +224,16 @@ add_module("example.html", {
     "modals": ["Sample modal"]
 })
 
-for filename, config in modules.items():
-    if filename == "plan.md":
-        continue
-    target = OUTPUT_DIR / filename
-    html = '<!-- Generated from plan specification -->\n' + render_module(config)
-    target.write_text(html + "\n", encoding="utf-8")
-
-print(f"Generated {len(modules)} partial(s)")
+def main():
+    for filename, config in modules.items():
+        if filename == "plan.md":
+            continue
+        target = OUTPUT_DIR / filename
+        html = '<!-- Generated from plan specification -->\n' + render_module(config)
+        target.write_text(html + "\n", encoding="utf-8")
+
+    print(f"Generated {len(modules)} partial(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import date
+
+from room_index import Room, RoomIndex, Stay
+
+
+@dataclass(frozen=True)
+class Booking:
+    sh_no: str
+    group: str
+    male: int
+    female: int
+    children: int
+    arrive: date
+    depart: date
+    priority: int = 0
+    vip: bool = False
+    keep_together: bool = True
+
+    @property
+    def pax(self) -> int:
+        return self.male + self.female + self.children
+
+
+@dataclass(frozen=True)
+class Conflict:
+    sh_no: str
+    group: str
+    reason: str
+    pax: int
+
+
+@dataclass
+class AllocationResult:
+    placements: list[Stay] = field(default_factory=list)
+    conflicts: list[Conflict] = field(default_factory=list)
+
+    def by_booking(self) -> dict[str, list[Stay]]:
+        grouped: dict[str, list[Stay]] = {}
+        for stay in self.placements:
+            grouped.setdefault(stay.ref, []).append(stay)
+        return grouped
+
+
+def _fill(candidates: list[tuple[int, Room]], pax: int) -> list[tuple[Room, int]]:
+    picked = []
+    for free, room in sorted(candidates, key=lambda item: (-item[0], item[1].key)):
+        take = min(free, pax)
+        picked.append((room, take))
+        pax -= take
+        if not pax:
+            break
+    return picked
+
+
+def _best_fit(groups: dict[tuple, list[tuple[int, Room]]], pax: int, prefer: str | None) -> list | None:
+    fitting = []
+    for group_key, candidates in groups.items():
+        total = sum(free for free, _ in candidates)
+        if total >= pax:
+            fitting.append((group_key[0] != prefer, total, group_key, candidates))
+    if not fitting:
+        return None
+    return _fill(min(fitting, key=lambda item: item[:3])[3], pax)
+
+
+def _place_party(pax, gender, booking, index, cache, prefer):
+    stay_key = (booking.arrive, booking.depart, gender)
+    free_by_room = cache.setdefault(stay_key, {})
+    floors: dict[tuple, list[tuple[int, Room]]] = {}
+    buildings: dict[tuple, list[tuple[int, Room]]] = {}
+    capacity = 0
+    for room in index.rooms.values():
+        free = free_by_room.get(room.key)
+        if free is None:
+            free = free_by_room[room.key] = index.free_beds(room.key, booking.arrive, booking.depart, gender)
+        capacity += free
+        # A group kept together stays in the building its first party got.
+        if booking.keep_together and prefer is not None and room.building != prefer:
+            continue
+        if free > 0:
+            floors.setdefault((room.building, room.floor), []).append((free, room))
+            buildings.setdefault((room.building,), []).append((free, room))
+    picked = _best_fit(floors, pax, prefer) or _best_fit(buildings, pax, prefer)
+    if picked is None and not booking.keep_together and capacity >= pax:
+        picked = _fill([item for candidates in buildings.values() for item in candidates], pax)
+    return picked, capacity
+
+
+def _release(stays: list[Stay], index: RoomIndex, cache: dict) -> None:
+    for stay in stays:
+        index.remove(stay)
+        for free_by_room in cache.values():
+            free_by_room.pop(stay.room, None)
+
+
+def _place_booking(booking, parties, index, cache, building):
+    # Each party's stays go into the index straight away so the next party
+    # sees those rooms as taken; if a later party does not fit, the whole
+    # booking is released again.
+    planned = []
+    prefer = building
+    for gender, pax in parties:
+        picked, capacity = _place_party(pax, gender, booking, index, cache, prefer)
+        if picked is None:
+            _release(planned, index, cache)
+            reason = "Insufficient capacity" if capacity < pax else "Group cannot be kept together"
+            label = "men" if gender == "M" else "women & children"
+            return [], Conflict(booking.sh_no, booking.group, f"{reason} ({label})", booking.pax)
+        prefer = picked[0][0].building
+        for room, take in picked:
+            stay = Stay(room.key, booking.arrive, booking.depart, take, gender, booking.sh_no)
+            index.add(stay)
+            for free_by_room in cache.values():
+                free_by_room.pop(room.key, None)
+            planned.append(stay)
+    return planned, None
+
+
+def allocate(bookings, rooms=(), existing=(), index: RoomIndex | None = None) -> AllocationResult:
+    # Pass a RoomIndex to allocate against (and fill) live occupancy; otherwise
+    # one is built from `rooms` and `existing` stays.
+    if index is None:
+        index = RoomIndex(rooms, existing)
+    # Free beds per (arrive, depart, gender) and room; placing into a room
+    # drops that room from every cached stay window.
+    cache: dict[tuple, dict[str, int]] = {}
+    result = AllocationResult()
+    order = sorted(bookings, key=lambda b: (not b.vip, -b.priority, b.arrive, -b.pax, b.sh_no))
+    for booking in order:
+        if booking.depart <= booking.arrive:
+            result.conflicts.append(Conflict(booking.sh_no, booking.group, "Departure is not after arrival", booking.pax))
+            continue
+        parties = [(gender, pax) for gender, pax in (("M", booking.male), ("F", booking.female + booking.children)) if pax]
+        # A group kept together goes wherever its first party fits best, or
+        # failing that into any other building both parties fit in.
+        retries = sorted({room.building for room in index.rooms.values()}) if booking.keep_together and len(parties) > 1 else []
+        conflicts = []
+        for building in [None, *retries]:
+            planned, conflict = _place_booking(booking, parties, index, cache, building)
+            if conflict is None:
+                result.placements.extend(planned)
+                break
+            conflicts.append(conflict)
+        else:
+            result.conflicts.append(conflicts[0])
+    return result
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import argparse
+import copy
+import json
+import statistics
+import sys
+import timeit
+from functools import partial
+from pathlib import Path
+
+import generate_partials
+
+ROOT = generate_partials.ROOT
+sys.path.insert(0, str(ROOT))
+import rebuild_partials  # noqa: E402
+
+BASELINE = Path(__file__).resolve().with_name("bench_baseline.json")
+SCALES = (10, 100)
+THRESHOLD = 0.25
+# Each timing sample loops its call until it has run at least this long, so
+# timer resolution and scheduler jitter stay small against the measurement.
+MIN_SAMPLE_SECONDS = 0.05
+REPEAT = 7
+# A single renderer only fails once it is this many microseconds slower too;
+# the total is gated on the threshold alone.
+NOISE_FLOOR_US = 25.0
+
+
+def scale_spec(spec: dict, factor: int) -> dict:
+    scaled = copy.deepcopy(spec)
+    scaled['file'] = f"x{factor}-{spec['file']}"
+    for key in ("kpis", "filters", "actions", "charts", "sidecards"):
+        if scaled.get(key):
+            scaled[key] = scaled[key] * factor
+    if scaled.get("modals"):
+        scaled["modals"] = [
+            dict(modal, id=f"{modal['id']}-{idx}") for idx, modal in enumerate(scaled["modals"] * factor)
+        ]
+    if scaled.get("tabs"):
+        scaled["tabs"] = [
+            dict(copy.deepcopy(tab), name=f"{tab['name']} {idx}") for idx, tab in enumerate(scaled["tabs"] * factor)
+        ]
+    tables = [scaled.get("table")] + [tab.get("table") for tab in scaled.get("tabs", [])]
+    for table in filter(None, tables):
+        table["columns"] = table["columns"] * factor
+    return scaled
+
+
+def synthetic_specs() -> list[dict]:
+    # The richest split and tabbed specs stand in for a grown fork of the site.
+    base = [
+        max(generate_partials.load_specs(), key=lambda spec: len(json.dumps(spec)) if spec.get("table") else 0),
+        next(spec for spec in generate_partials.load_specs() if spec.get("tabs")),
+    ]
+    return [scale_spec(spec, factor) for factor in SCALES for spec in base]
+
+
+def calibrate(timer: timeit.Timer, min_time: float) -> int:
+    # timeit's autorange() steps, with our own minimum instead of its 0.2 s.
+    scale = 1
+    while True:
+        for step in (1, 2, 5):
+            number = scale * step
+            if timer.timeit(number) >= min_time:
+                return number
+        scale *= 10
+
+
+def run(repeat: int = REPEAT, min_time: float = MIN_SAMPLE_SECONDS) -> dict:
+    calls = {}
+    for spec in generate_partials.load_specs() + synthetic_specs():
+        calls[f"render_page:{spec['file']}"] = partial(generate_partials.render_page, spec)
+    for filename, config in rebuild_partials.modules.items():
+        calls[f"render_module:{filename}"] = partial(rebuild_partials.render_module, config)
+    timers = {name: timeit.Timer(call) for name, call in calls.items()}
+    numbers = {name: calibrate(timer, min_time) for name, timer in timers.items()}
+    # Samples are taken round-robin, so a slow spell on the machine lands on
+    # one sample of many renderers rather than on every sample of one.
+    samples = {name: [] for name in timers}
+    for _ in range(repeat):
+        for name, timer in timers.items():
+            samples[name].append(timer.timeit(numbers[name]) / numbers[name] * 1e6)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def compare(timings: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, current in timings.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current > previous * (1 + threshold) and current - previous > NOISE_FLOOR_US:
+            regressions.append(f"{name}: {previous:.1f} us -> {current:.1f} us (+{current / previous - 1:.0%})")
+    shared = [name for name in timings if name in baseline]
+    current = sum(timings[name] for name in shared)
+    previous = sum(baseline[name] for name in shared)
+    if shared and current > previous * (1 + threshold):
+        regressions.append(f"Total: {previous:.1f} us -> {current:.1f} us (+{current / previous - 1:.0%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the partial renderers against a stored baseline.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="write the current timings as the new baseline")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown per renderer and in total before failing, as a fraction (default 0.25)")
+    parser.add_argument("--min-time", type=float, default=MIN_SAMPLE_SECONDS,
+                        help="minimum seconds each timing sample runs for; the call count is calibrated to it")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timing samples per renderer; the median is kept")
+    args = parser.parse_args(argv)
+
+    timings = run(repeat=args.repeat, min_time=args.min_time)
+    width = max(len(name) for name in timings)
+    for name, micros in timings.items():
+        print(f"{name:<{width}}  {micros:>10.1f} us")
+    print(f"{'Total':<{width}}  {sum(timings.values()):>10.1f} us")
+
+    if args.save:
+        args.baseline.write_text(json.dumps(timings, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save first")
+        return
+    regressions = compare(timings, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions:
+        raise SystemExit(1)
+    print(f"No renderer regressed more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
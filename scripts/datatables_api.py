@@ -0,0 +1,213 @@
+from __future__ import annotations
+import heapq
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from itertools import islice
+
+CURSOR_CACHE_SIZE = 512
+MAX_PAGE = 500
+
+
+@dataclass(frozen=True)
+class Column:
+    data: str
+    # Database column used for ordering and searching, when there is one.
+    field: str | None = None
+    exact: bool = False
+    reverse: bool = False
+
+
+@dataclass(frozen=True)
+class View:
+    table: str
+    statuses: tuple[str, ...]
+    columns: tuple[Column, ...]
+    default_order: str = "created_at"
+    # Sort columns backed by an index ending in the primary key, where pages
+    # after the first can seek from the previous page's last row.
+    keyset: tuple[str, ...] = ("created_at",)
+
+
+RESERVATION_COLUMNS = {
+    "ref_no": Column("ref_no", "ref_no"),
+    "guest": Column("guest", "full_name"),
+    "created_at": Column("created_at", "created_at"),
+    # Age runs the other way from the request date: oldest first is the
+    # largest age.
+    "age": Column("age", "created_at", reverse=True),
+    "total_pax": Column("total_pax", "total_pax"),
+    "dates": Column("dates", "arrival_date"),
+    "package_code": Column("package_code", "package_code"),
+    "source": Column("source", "source", exact=True),
+    "notes": Column("notes", "notes"),
+    "status": Column("status", "status", exact=True),
+    "actions": Column("actions"),
+}
+
+# One view per generated reservations page; the column order matches the
+# page's table headers.
+VIEWS = {
+    "reservations-pending": View(
+        table="reservations_individuals",
+        statuses=("pending", "awaiting_payment"),
+        columns=tuple(RESERVATION_COLUMNS[name] for name in (
+            "ref_no", "guest", "created_at", "age", "source", "notes", "actions")),
+    ),
+    "reservations-approved": View(
+        table="reservations_individuals",
+        statuses=("approved",),
+        columns=tuple(RESERVATION_COLUMNS[name] for name in (
+            "ref_no", "guest", "total_pax", "dates", "package_code", "source", "status", "actions")),
+    ),
+}
+
+# Bumped on every write to a table so cached cursors and counts for it are
+# never reused across changes.
+GENERATIONS: dict[str, int] = {}
+_cursors: OrderedDict = OrderedDict()
+_counts: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+
+def invalidate(table: str) -> None:
+    GENERATIONS[table] = GENERATIONS.get(table, 0) + 1
+
+
+def _remember(cache: OrderedDict, key, value) -> None:
+    with _lock:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > CURSOR_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def _int(params: dict, name: str, default: int) -> int:
+    try:
+        return int(params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _search_value(value: str) -> str:
+    # DataTables' regex column search is commonly used as ^value$ for an exact
+    # match; anything else is treated as a plain substring.
+    return re.sub(r"^\^|\$$", "", value or "")
+
+
+def _derive(row: dict, today: date) -> dict:
+    created = (row.get("created_at") or "")[:10]
+    try:
+        age = (today - date.fromisoformat(created)).days
+    except ValueError:
+        age = None
+    arrive, depart = row.get("arrival_date"), row.get("departure_date")
+    return {
+        **row,
+        "guest": row.get("full_name") or row.get("group_name") or "",
+        "age": f"{age} d" if age is not None else "",
+        "dates": f"{arrive} → {depart}" if arrive and depart else arrive or "",
+        "actions": None,
+    }
+
+
+def respond(db: sqlite3.Connection, view_name: str, params: dict, today: date | None = None) -> dict:
+    # DataTables server-side protocol: draw/start/length/search/order/columns
+    # in, {draw, recordsTotal, recordsFiltered, data} out.
+    draw = _int(params, "draw", 0)
+    view = VIEWS.get(view_name)
+    if view is None:
+        return {"draw": draw, "recordsTotal": 0, "recordsFiltered": 0, "data": [], "error": f"Unknown view {view_name}"}
+    start = max(_int(params, "start", 0), 0)
+    length = _int(params, "length", 10)
+    length = MAX_PAGE if length < 0 else min(length, MAX_PAGE)
+
+    base = [f"status IN ({', '.join('?' * len(view.statuses))})"]
+    base_args: list = list(view.statuses)
+    where, args = list(base), list(base_args)
+    for idx, column in enumerate(view.columns):
+        value = _search_value(params.get(f"columns[{idx}][search][value]", ""))
+        if value and column.field:
+            where.append(f'"{column.field}" = ?' if column.exact else f'"{column.field}" LIKE ?')
+            args.append(value if column.exact else f"%{value}%")
+    needle = (params.get("search[value]") or "").strip()
+    if needle:
+        where.append("(ref_no LIKE ? OR its_no LIKE ? OR full_name LIKE ? OR group_name LIKE ?)")
+        args += [f"{needle}%", f"{needle}%", f"%{needle}%", f"%{needle}%"]
+
+    order_idx = _int(params, "order[0][column]", -1)
+    column = view.columns[order_idx] if 0 <= order_idx < len(view.columns) else None
+    field = (column.field if column else None) or view.default_order
+    descending = (params.get("order[0][dir]") or ("desc" if field == view.default_order else "asc")) == "desc"
+    if column and column.field and column.reverse:
+        descending = not descending
+    direction = "DESC" if descending else "ASC"
+
+    generation = GENERATIONS.get(view.table, 0)
+    filter_key = (view_name, generation, tuple(where), tuple(args))
+    total = _count(db, view.table, base, base_args, (view_name, generation, tuple(base), tuple(base_args)))
+    filtered = total if where == base else _count(db, view.table, where, args, filter_key)
+
+    extra_where, extra_args = where[1:], args[len(view.statuses):]
+    # Row-value seeks and the merge cannot order NULLs, so a queue holding
+    # any row without the sort value is paged by offset instead.
+    nulls = where + [f'"{field}" IS NULL']
+    if field in view.keyset and not _count(db, view.table, nulls, args, filter_key + (field, "nulls")):
+        rows = _keyset_page(db, view, extra_where, extra_args, field, descending, start, length,
+                            (filter_key, field, descending))
+    else:
+        sql = (
+            f'SELECT * FROM "{view.table}" WHERE {" AND ".join(where)} '
+            f'ORDER BY "{field}" {direction}, id {direction} LIMIT ? OFFSET ?'
+        )
+        rows = [dict(row) for row in db.execute(sql, args + [length, start])]
+
+    today = today or date.today()
+    return {
+        "draw": draw,
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": [_derive(row, today) for row in rows],
+    }
+
+
+def _keyset_page(db, view: View, where: list[str], args: list, field: str, descending: bool,
+                 start: int, length: int, cursor_key) -> list[dict]:
+    # Seek from the nearest page boundary already served at or before `start`
+    # and skip only the remainder. Each status is read on its own so every
+    # read is an ordered range scan of (status, field, id); the per-status
+    # runs are then merged, which avoids sorting the whole queue for an IN.
+    known = _cursors.get(cursor_key, {})
+    boundary = max((pos for pos in known if pos <= start), default=0)
+    seek, seek_args = [], []
+    if boundary:
+        seek = [f'("{field}", id) {"<" if descending else ">"} (?, ?)']
+        seek_args = list(known[boundary])
+    skip = start - boundary
+    direction = "DESC" if descending else "ASC"
+    # Only (field, id) is read while merging, which the status index covers;
+    # full rows are fetched for the one page that is returned.
+    sql = (
+        f'SELECT "{field}", id FROM "{view.table}" WHERE {" AND ".join(["status = ?"] + where + seek)} '
+        f'ORDER BY "{field}" {direction}, id {direction} LIMIT ?'
+    )
+    runs = [db.execute(sql, [status] + args + seek_args + [skip + length]).fetchall() for status in view.statuses]
+    keys = [tuple(key) for key in islice(heapq.merge(*runs, key=tuple, reverse=descending), skip, skip + length)]
+    if not keys:
+        return []
+    _remember(_cursors, cursor_key, {**known, start + len(keys): keys[-1]})
+    placeholders = ", ".join("?" * len(keys))
+    found = {row["id"]: dict(row) for row in db.execute(
+        f'SELECT * FROM "{view.table}" WHERE id IN ({placeholders})', [key[1] for key in keys])}
+    return [found[key[1]] for key in keys]
+
+
+def _count(db: sqlite3.Connection, table: str, where: list[str], args: list, key) -> int:
+    count = _counts.get(key)
+    if count is None:
+        count = db.execute(f'SELECT COUNT(*) FROM "{table}" WHERE {" AND ".join(where)}', args).fetchone()[0]
+        _remember(_counts, key, count)
+    return count
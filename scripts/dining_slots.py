@@ -0,0 +1,228 @@
+from __future__ import annotations
+import bisect
+import csv
+import threading
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DINING_TIME = timedelta(minutes=30)
+TURNOVER = timedelta(minutes=10)
+# A group that has not arrived this long after its sitting started goes back
+# into the queue.
+GRACE = timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class Hall:
+    name: str
+    capacity: int
+    opens: datetime
+    closes: datetime
+
+
+@dataclass(frozen=True)
+class Sitting:
+    hall: str
+    start: datetime
+    capacity: int
+
+
+@dataclass(frozen=True)
+class DiningGroup:
+    sh_no: str
+    group: str
+    pax: int
+    ready_at: datetime
+
+
+def sittings(halls, dining: timedelta = DINING_TIME, turnover: timedelta = TURNOVER) -> list[Sitting]:
+    # Back-to-back sittings per hall, each followed by the turnover needed to
+    # clear and reset tables.
+    found = []
+    for hall in halls:
+        start = hall.opens
+        while start + dining <= hall.closes:
+            found.append(Sitting(hall.name, start, hall.capacity))
+            start += dining + turnover
+    return sorted(found, key=lambda sitting: (sitting.start, sitting.hall))
+
+
+class DiningPlan:
+    # Assigns waiting groups to the earliest hall sitting they fit into
+    # (groups are never split). Seated groups keep their seats; everything
+    # else is re-slotted on each schedule() call, which only walks the queue
+    # and is cheap enough to run on every "Mark seated".
+    def __init__(self, halls, groups=(), dining: timedelta = DINING_TIME, turnover: timedelta = TURNOVER):
+        self.halls = {hall.name: hall for hall in halls}
+        self.dining = dining
+        self.sittings = sittings(self.halls.values(), dining, turnover)
+        self._starts = [sitting.start for sitting in self.sittings]
+        self.groups: dict[str, DiningGroup] = {group.sh_no: group for group in groups}
+        self.seated: dict[str, int] = {}
+        self.assigned: dict[str, int] = {}
+        self._seated_load = [0] * len(self.sittings)
+        self.load = list(self._seated_load)
+
+    def add_group(self, group: DiningGroup) -> None:
+        self.groups[group.sh_no] = group
+
+    def _sitting_at(self, hall: str, when: datetime) -> int:
+        # The sitting in `hall` running at `when`, else the next one, else its
+        # last sitting.
+        for pos in range(bisect.bisect_right(self._starts, when - self.dining), len(self.sittings)):
+            if self.sittings[pos].hall == hall:
+                return pos
+        last = max((pos for pos, sitting in enumerate(self.sittings) if sitting.hall == hall), default=None)
+        if last is None:
+            raise ValueError(f"Hall {hall} has no sittings" if hall in self.halls else f"Unknown hall {hall}")
+        return last
+
+    def mark_seated(self, sh_no: str, now: datetime, hall: str | None = None) -> None:
+        if sh_no not in self.groups:
+            raise ValueError(f"Unknown group {sh_no}")
+        pos = self.assigned.get(sh_no)
+        if hall is not None and (pos is None or self.sittings[pos].hall != hall):
+            pos = self._sitting_at(hall, now)
+        if pos is None:
+            raise ValueError(f"{sh_no} has no sitting; pass the hall it was seated in")
+        if sh_no in self.seated:
+            self._seated_load[self.seated[sh_no]] -= self.groups[sh_no].pax
+        self.seated[sh_no] = pos
+        self._seated_load[pos] += self.groups[sh_no].pax
+        self.schedule(now)
+
+    def schedule(self, now: datetime) -> None:
+        self.load = list(self._seated_load)
+        self.assigned = {}
+        first_open = bisect.bisect_left(self._starts, now - GRACE)
+        queue = []
+        for group in self.groups.values():
+            if group.sh_no in self.seated:
+                continue
+            if group.ready_at < now - GRACE:
+                group = replace(group, ready_at=now - GRACE)
+            queue.append(group)
+        # Earliest-ready first, larger groups first on ties, each into the
+        # first sitting at or after it is ready with room for the whole group.
+        for group in sorted(queue, key=lambda group: (group.ready_at, -group.pax, group.sh_no)):
+            pos = max(bisect.bisect_left(self._starts, group.ready_at), first_open)
+            while pos < len(self.sittings) and self.load[pos] + group.pax > self.sittings[pos].capacity:
+                pos += 1
+            if pos < len(self.sittings):
+                self.assigned[group.sh_no] = pos
+                self.load[pos] += group.pax
+
+    def waiting(self) -> list[DiningGroup]:
+        return [group for sh_no, group in self.groups.items() if sh_no not in self.seated]
+
+    def wait_minutes(self, sh_no: str) -> int | None:
+        pos = self.assigned.get(sh_no)
+        if pos is None:
+            return None
+        return max(int((self.sittings[pos].start - self.groups[sh_no].ready_at).total_seconds() // 60), 0)
+
+    def ordered(self) -> list[DiningGroup]:
+        return sorted(self.groups.values(), key=lambda group: (group.ready_at, group.sh_no))
+
+    def session_rows(self) -> list[list[str]]:
+        # Rows for mawaid-dining-hall.html's "Session table".
+        rows = []
+        for group in self.ordered():
+            pos = self.seated.get(group.sh_no, self.assigned.get(group.sh_no))
+            sitting = self.sittings[pos] if pos is not None else None
+            if group.sh_no in self.seated:
+                status, notes = "Seated", ""
+            elif sitting is not None:
+                status, notes = "Assigned", f"Wait {self.wait_minutes(group.sh_no)} min"
+            else:
+                status, notes = "Waiting", "No sitting with room"
+            rows.append([
+                f"{group.group} / {group.sh_no}",
+                str(group.pax),
+                sitting.hall if sitting else "",
+                f"{sitting.start:%H:%M}" if sitting else "",
+                status,
+                notes,
+                "Mark seated" if status != "Seated" else "Move",
+            ])
+        return rows
+
+    def timeline(self, now: datetime, limit: int = 5) -> list[str]:
+        upcoming = [
+            (sitting, self.load[pos]) for pos, sitting in enumerate(self.sittings)
+            if sitting.start >= now - GRACE
+        ]
+        return [
+            f"{sitting.start:%H:%M} · Hall {sitting.hall} · {sitting.capacity - load} of {sitting.capacity} free"
+            for sitting, load in upcoming[:limit]
+        ]
+
+    def kpis(self, now: datetime) -> dict[str, int]:
+        # Card values for mawaid-dining-hall.html.
+        return {
+            "Expected pax": sum(group.pax for group in self.groups.values()),
+            "Seated": sum(self.groups[sh_no].pax for sh_no in self.seated),
+            "Remaining capacity": sum(
+                sitting.capacity - self.load[pos] for pos, sitting in enumerate(self.sittings)
+                if sitting.start >= now - GRACE
+            ),
+            "Waiting groups": len(self.waiting()),
+        }
+
+
+def plan_from_csv(halls_path: Path, groups_path: Path, now: datetime) -> DiningPlan:
+    groups, seated = load_groups_csv(groups_path)
+    plan = DiningPlan(load_halls_csv(halls_path), groups)
+    for sh_no, hall in seated.items():
+        plan.mark_seated(sh_no, now, hall=hall)
+    plan.schedule(now)
+    return plan
+
+
+class LiveQueue:
+    # The plan held by the local stand-in for /dining/v1/queue. Every read
+    # re-slots the queue against the clock, so late groups drop back into it,
+    # and "Mark seated" updates the plan in place.
+    def __init__(self, plan: DiningPlan):
+        self.plan = plan
+        self._lock = threading.Lock()
+
+    def _payload(self, now: datetime) -> dict:
+        return {
+            "kpis": self.plan.kpis(now),
+            "rows": self.plan.session_rows(),
+            "sh_no": [group.sh_no for group in self.plan.ordered()],
+            "timeline": self.plan.timeline(now),
+        }
+
+    def snapshot(self, now: datetime | None = None) -> dict:
+        now = now or datetime.now()
+        with self._lock:
+            self.plan.schedule(now)
+            return self._payload(now)
+
+    def seat(self, sh_no: str, hall: str | None = None, now: datetime | None = None) -> dict:
+        now = now or datetime.now()
+        with self._lock:
+            self.plan.mark_seated(sh_no, now, hall=hall)
+            return self._payload(now)
+
+
+def load_halls_csv(path: Path) -> list[Hall]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Hall(row["hall"], int(row["capacity"]), datetime.fromisoformat(row["opens"]), datetime.fromisoformat(row["closes"]))
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_groups_csv(path: Path) -> tuple[list[DiningGroup], dict[str, str]]:
+    # Returns the groups and, for those already seated, the hall they are in.
+    groups, seated = [], {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            groups.append(DiningGroup(row["sh_no"], row["group"], int(row["pax"]), datetime.fromisoformat(row["ready_at"])))
+            if row.get("seated_hall"):
+                seated[row["sh_no"]] = row["seated_hall"]
+    return groups, seated
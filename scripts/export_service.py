@@ -0,0 +1,150 @@
+from __future__ import annotations
+import codecs
+import csv
+import io
+import re
+import sqlite3
+import zipfile
+from collections.abc import Iterable, Iterator
+from xml.sax.saxutils import escape
+
+FETCH_BATCH = 2000
+CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Characters XML 1.0 cannot carry, even escaped.
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+_SHEET_NAME_ILLEGAL = re.compile(r"[\[\]:*?/\\]")
+
+SPREADSHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+DOC_RELS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+def iter_rows(cursor: sqlite3.Cursor, batch: int = FETCH_BATCH) -> Iterator[tuple]:
+    # Pulls rows a batch at a time so only `batch` rows are ever held.
+    while True:
+        rows = cursor.fetchmany(batch)
+        if not rows:
+            return
+        yield from rows
+
+
+def csv_chunks(headers: list[str], rows: Iterable, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    # UTF-8 with a BOM so Excel picks the encoding for Arabic names; each
+    # chunk is yielded as soon as it reaches chunk_size.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\r\n")
+    writer.writerow(headers)
+    first = True
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            data = buffer.getvalue().encode("utf-8")
+            yield (codecs.BOM_UTF8 + data) if first else data
+            first = False
+            buffer.seek(0)
+            buffer.truncate()
+    data = buffer.getvalue().encode("utf-8")
+    yield (codecs.BOM_UTF8 + data) if first else data
+
+
+def _cell(value) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values) -> str:
+    return "<row>" + "".join(_cell(value) for value in values) + "</row>"
+
+
+def write_xlsx(fp, headers: list[str], rows: Iterable, sheet: str = "Export") -> None:
+    # A minimal workbook with one sheet of inline strings, so nothing has to
+    # be collected up front (a shared-strings table would need every value
+    # before the sheet is written). zipfile streams each part through the
+    # compressor and copes with an unseekable `fp` by writing data
+    # descriptors, so memory stays flat whatever the row count.
+    sheet = _SHEET_NAME_ILLEGAL.sub(" ", sheet)[:31] or "Export"
+    with zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_DEFLATED) as book:
+        book.writestr("[Content_Types].xml", XML_DECL + (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        ))
+        book.writestr("_rels/.rels", XML_DECL + (
+            f'<Relationships xmlns="{RELS_NS}">'
+            f'<Relationship Id="rId1" Type="{DOC_RELS}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        book.writestr("xl/workbook.xml", XML_DECL + (
+            f'<workbook xmlns="{SPREADSHEET_NS}" xmlns:r="{DOC_RELS}">'
+            f'<sheets><sheet name="{escape(sheet, {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        book.writestr("xl/_rels/workbook.xml.rels", XML_DECL + (
+            f'<Relationships xmlns="{RELS_NS}">'
+            f'<Relationship Id="rId1" Type="{DOC_RELS}/worksheet" Target="worksheets/sheet1.xml"/>'
+            '</Relationships>'
+        ))
+        with book.open("xl/worksheets/sheet1.xml", "w") as part:
+            out = io.TextIOWrapper(part, encoding="utf-8", write_through=False)
+            out.write(XML_DECL + f'<worksheet xmlns="{SPREADSHEET_NS}">')
+            # Keep the header row in view while scrolling.
+            out.write('<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+                      'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>')
+            out.write(_row(headers))
+            for row in rows:
+                out.write(_row(row))
+            out.write("</sheetData></worksheet>")
+            out.flush()
+            out.detach()
+
+
+class ChunkedWriter(io.RawIOBase):
+    # Write-only file object that sends everything written to it as HTTP/1.1
+    # chunks of about CHUNK_SIZE bytes.
+    def __init__(self, wfile, chunk_size: int = CHUNK_SIZE):
+        self.wfile = wfile
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self._send()
+        return len(data)
+
+    def _send(self) -> None:
+        if self.buffer:
+            write_chunk(self.wfile, bytes(self.buffer))
+            self.buffer.clear()
+
+    def close(self) -> None:
+        if not self.closed:
+            self._send()
+        super().close()
+
+
+def write_chunk(wfile, data: bytes) -> None:
+    if data:
+        wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+
+def end_chunks(wfile) -> None:
+    wfile.write(b"0\r\n\r\n")
+    wfile.flush()
@@ -1,9 +1,242 @@
 ﻿from __future__ import annotations
+import argparse
+import gzip
+import hashlib
+from functools import lru_cache, partial, wraps
+import inspect
+import json
+import os
+import re
+from datetime import date, datetime
+from html import escape
 from pathlib import Path
 from textwrap import dedent
+from urllib.parse import urlencode
 
 ROOT = Path(__file__).resolve().parents[1]
 PARTIALS = ROOT / "partials"
+MANIFEST = PARTIALS / ".build-manifest.json"
+SPA_INDEX = ROOT / "index-spa.html"
+HASHED_MANIFEST = PARTIALS / "manifest.json"
+STATIC_ASSETS = [(ROOT / "css", "*.css"), (ROOT / "js", "*.js")]
+COMPRESS_THRESHOLD = 1024
+DATA_PARTIAL = re.compile(r'data-partial="partials/([\w-]+?)(?:\.[0-9a-f]{10})?\.html"')
+BUNDLE_META = re.compile(r'(<meta name="ums-partials-bundle" content=")([^"]*)(">)')
+# Reference time for pages computed from data/*.csv exports (ISO date or
+# datetime); --as-of sets it. Builds only read the clock when it is unset.
+AS_OF_ENV = "UMS_AS_OF"
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+_SLOT = re.compile(r"\{(\w+)\}")
+_WHITESPACE_ONLY = re.compile(r"^[ \t]+$", re.MULTILINE)
+
+
+# Fragment templates are split once at import into literal chunks and named
+# slots, so rendering is a single "".join. A slot alone on its line keeps the
+# line's indentation and drops it when the value is empty or starts on a new
+# line, which is what dedent() plus the old per-line rstrip produced.
+class Template:
+    def __init__(self, text: str, strip_margin: bool = True):
+        self.source = dedent(text) if strip_margin else _WHITESPACE_ONLY.sub("", text)
+        self.parts: list = []
+        pos = 0
+        for match in _SLOT.finditer(self.source):
+            literal = self.source[pos:match.start()]
+            line_start = literal.rfind("\n") + 1
+            indent = literal[line_start:]
+            if indent.strip() or not self.source.startswith("\n", match.end()):
+                indent = ""
+            self.parts.append(literal[:len(literal) - len(indent)])
+            self.parts.append((match.group(1), indent))
+            pos = match.end()
+        self.parts.append(self.source[pos:])
+
+    def fill(self, **values) -> str:
+        out = []
+        for part in self.parts:
+            if part.__class__ is str:
+                out.append(part)
+                continue
+            name, indent = part
+            value = values[name]
+            if indent and value[:1] not in ("", "\n"):
+                out.append(indent)
+            out.append(value)
+        return "".join(out)
+
+
+FILTER_INPUT = Template("""
+    <div class="col-md-3">
+      <label class="form-label">{label}</label>
+      <input type="text" class="form-control form-control-sm" placeholder="{label}">
+    </div>
+""")
+
+FILTERS = Template("""
+        <div class="card mb-3">
+          <div class="card-body">
+            <form class="row g-3">
+{inputs}
+              <div class="col-md-3 d-flex align-items-end">
+                <div class="btn-group">
+                  <button type="button" class="btn btn-primary btn-sm">Apply</button>
+                  <button type="button" class="btn btn-outline-secondary btn-sm">Reset</button>
+                </div>
+              </div>
+            </form>
+          </div>
+        </div>
+""", strip_margin=False)
+
+CARD = Template("""
+    <div class="col-sm-6 col-lg-3">
+      <div class="card mb-3">
+        <div class="card-body">
+          <div class="text-muted small">{label}</div>
+          <h3 class="mb-2">{value}</h3>
+          {badge}
+        </div>
+      </div>
+    </div>
+""")
+
+BUTTONS = Template("""
+    <div class="d-flex flex-wrap gap-2 mb-3"{attrs}>{buttons}</div>
+""")
+
+TABLE = Template("""
+        <div class="card mb-3">
+          <div class="card-header">
+            <h5 class="card-title mb-0">{title}</h5>
+            <div class="text-muted small">{description}</div>
+          </div>
+          <div class="table-responsive">
+            <table class="table table-striped align-middle"{attrs}>
+              <thead>
+                <tr>{headers}</tr>
+              </thead>
+              <tbody>
+{rows}
+              </tbody>
+            </table>
+          </div>
+        </div>
+""", strip_margin=False)
+
+TAB_NAV = Template("""
+          <li class="nav-item">
+            <button class="nav-link {active}" data-bs-toggle="tab" data-bs-target="#{tab_id}" type="button" role="tab" aria-selected="{selected}">{name}</button>
+          </li>
+""")
+
+# A pane holding a table keeps its indentation: the table's unindented rows
+# pinned the old dedent() margin at zero.
+TAB_PANE = Template("""
+          <div class="tab-pane fade {show}" id="{tab_id}" role="tabpanel">
+            <p class="text-muted">{description}</p>
+            {table}
+          </div>
+""")
+
+TAB_PANE_WITH_TABLE = Template("""
+          <div class="tab-pane fade {show}" id="{tab_id}" role="tabpanel">
+            <p class="text-muted">{description}</p>
+            {table}
+          </div>
+""", strip_margin=False)
+
+TABS = Template("""
+        <div class="card mb-3">
+          <div class="card-header border-bottom-0 pb-0">
+            <ul class="nav nav-tabs card-header-tabs" role="tablist">
+{nav}
+            </ul>
+          </div>
+          <div class="card-body">
+            <div class="tab-content">
+{content}
+            </div>
+          </div>
+        </div>
+""", strip_margin=False)
+
+SIDECARD = Template("""
+    <div class="card mb-3">
+      <div class="card-header">
+        <h5 class="card-title mb-0">{title}</h5>
+      </div>
+      <div class="card-body">
+        <p class="text-muted small">{description}</p>
+        <ul class="small ps-3 mb-0">{items}</ul>
+        {extra}
+      </div>
+    </div>
+""")
+
+CHART = Template("""
+    <div class="card mb-3">
+      <div class="card-header">
+        <h5 class="card-title mb-0">{title}</h5>
+        <div class="text-muted small">{description}</div>
+      </div>
+      <div class="card-body">
+        <div class="chart-placeholder"{series} style="height: 220px; background: rgba(0,0,0,.04); border-radius: .5rem;"></div>
+      </div>
+    </div>
+""")
+
+MODAL = Template("""
+    <div class="modal fade" tabindex="-1" id="modal-{id}" aria-hidden="true">
+      <div class="modal-dialog modal-lg modal-dialog-centered">
+        <div class="modal-content">
+          <div class="modal-header">
+            <h5 class="modal-title">{title}</h5>
+            <button type="button" class="btn-close" data-bs-dismiss="modal" aria-label="Close"></button>
+          </div>
+          <div class="modal-body">
+            <p class="text-muted">{description}</p>
+          </div>
+          <div class="modal-footer">
+            <button type="button" class="btn btn-outline-secondary" data-bs-dismiss="modal">Cancel</button>
+            <button type="button" class="btn btn-primary">Save</button>
+          </div>
+        </div>
+      </div>
+    </div>
+""")
+
+PAGE_HEADER = Template("""
+    <div class="row mb-2 mb-xl-3">
+      <div class="col-auto d-none d-sm-block">
+        <h3 class="mb-0"><strong>{section}</strong> / {title}</h3>
+        <div class="text-muted">{goal}</div>
+      </div>
+    </div>
+""")
+
+PAGE_FULL = Template("""
+            <div class="container-fluid p-0">
+              {header}
+              {main}
+              {modals}
+            </div>
+""", strip_margin=False)
+
+PAGE_SPLIT = Template("""
+            <div class="container-fluid p-0">
+              {header}
+              <div class="row">
+                <div class="col-xxl-9">{main}</div>
+                <div class="col-xxl-3">{sidecards}</div>
+              </div>
+              {modals}
+            </div>
+""", strip_margin=False)
 
 
 def render_badge(text: str, badge: str = "bg-primary") -> str:
@@ -15,60 +248,35 @@ def render_badge(text: str, badge: str = "bg-primary") -> str:
 def render_filters(filters: list[str]) -> str:
     if not filters:
         return ""
-    inputs = []
-    for flt in filters:
-        inputs.append(dedent(f"""
-            <div class=\"col-md-3\">
-              <label class=\"form-label\">{flt}</label>
-              <input type=\"text\" class=\"form-control form-control-sm\" placeholder=\"{flt}\">
-            </div>
-        """))
-    return dedent(f"""
-        <div class=\"card mb-3\">
-          <div class=\"card-body\">
-            <form class=\"row g-3\">
-{''.join(inputs)}
-              <div class=\"col-md-3 d-flex align-items-end\">
-                <div class=\"btn-group\">
-                  <button type=\"button\" class=\"btn btn-primary btn-sm\">Apply</button>
-                  <button type=\"button\" class=\"btn btn-outline-secondary btn-sm\">Reset</button>
-                </div>
-              </div>
-            </form>
-          </div>
-        </div>
-    """)
+    inputs = "".join(FILTER_INPUT.fill(label=flt) for flt in filters)
+    return FILTERS.fill(inputs=inputs)
 
 
-def render_cards(cards: list[dict]) -> str:
+def render_cards(cards: list[dict], rollups: str | None = None) -> str:
     if not cards:
         return ""
-    items = []
-    for card in cards:
-        badge = render_badge(card.get("context"), card.get("badge", "bg-primary"))
-        items.append(dedent(f"""
-            <div class=\"col-sm-6 col-lg-3\">
-              <div class=\"card mb-3\">
-                <div class=\"card-body\">
-                  <div class=\"text-muted small\">{card['label']}</div>
-                  <h3 class=\"mb-2\">{card['value']}</h3>
-                  {badge}
-                </div>
-              </div>
-            </div>
-        """))
-    return "<div class=\"row\">" + "".join(items) + "</div>"
+    items = "".join(
+        CARD.fill(
+            label=card['label'],
+            value=card['value'],
+            badge=render_badge(card.get("context"), card.get("badge", "bg-primary")),
+        )
+        for card in cards
+    )
+    # Pages with declared KPI rollups fetch live card values from `rollups`.
+    attrs = f' data-kpi-rollups="{rollups}"' if rollups else ""
+    return f"<div class=\"row\"{attrs}>" + items + "</div>"
 
 
-def render_buttons(actions: list[str]) -> str:
+def render_buttons(actions: list[str], export: str | None = None) -> str:
     if not actions:
         return ""
     btns = "".join(
         f"<button type=\"button\" class=\"btn btn-outline-primary btn-sm\">{action}</button>" for action in actions
     )
-    return dedent(f"""
-        <div class=\"d-flex flex-wrap gap-2 mb-3\">{btns}</div>
-    """)
+    # Export/Download actions stream `export` from the export service.
+    attrs = f' data-export="{escape(export)}"' if export else ""
+    return BUTTONS.fill(attrs=attrs, buttons=btns)
 
 
 def render_table(table: dict) -> str:
@@ -77,28 +285,33 @@ def render_table(table: dict) -> str:
     columns = table.get("columns", [])
     if not columns:
         return ""
-    sample_rows = []
-    for _ in range(3):
-        tds = "".join(f"<td>Sample {col}</td>" for col in columns)
-        sample_rows.append(f"<tr>{tds}</tr>")
-    return dedent(f"""
-        <div class=\"card mb-3\">
-          <div class=\"card-header\">
-            <h5 class=\"card-title mb-0\">{table.get('title', 'Data')}</h5>
-            <div class=\"text-muted small\">{table.get('description', 'Replace with live data')}</div>
-          </div>
-          <div class=\"table-responsive\">
-            <table class=\"table table-striped align-middle\">
-              <thead>
-                <tr>{''.join(f'<th>{col}</th>' for col in columns)}</tr>
-              </thead>
-              <tbody>
-{''.join(sample_rows)}
-              </tbody>
-            </table>
-          </div>
-        </div>
-    """)
+    # Server-side tables keep these rows until the SPA swaps them for the
+    # DataTables endpoint's, which it only does when a stand-in is set.
+    if table.get("rows"):
+        rows = "".join("<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in table["rows"])
+    else:
+        rows = ("<tr>" + "".join(f"<td>Sample {col}</td>" for col in columns) + "</tr>") * 3
+    return TABLE.fill(
+        title=table.get('title', 'Data'),
+        description=table.get('description', 'Replace with live data'),
+        attrs=table_attrs(table),
+        headers="".join(f"<th>{col}</th>" for col in columns),
+        rows=rows,
+    )
+
+
+def table_attrs(table: dict) -> str:
+    attrs = ""
+    server_side = table.get("server_side")
+    if server_side:
+        attrs += f' data-dt-ajax="{server_side["url"]}" data-dt-columns="{",".join(server_side["columns"])}"'
+    if table.get("report"):
+        # Report pages refill the table and chart series from their cube.
+        attrs += f' data-report="{table["report"]}"'
+    if table.get("queue"):
+        # Live queue polled from the local stand-in.
+        attrs += f' data-queue="{table["queue"]}"'
+    return attrs
 
 
 def render_tabs(tabs: list[dict]) -> str:
@@ -107,113 +320,70 @@ def render_tabs(tabs: list[dict]) -> str:
     nav = []
     content = []
     for idx, tab in enumerate(tabs):
-        active = "active" if idx == 0 else ""
-        show = "show active" if idx == 0 else ""
-        selected = "true" if idx == 0 else "false"
         tab_id = f"tab-{tab['name'].lower().replace(' ', '-') }"
-        nav.append(dedent(f"""
-          <li class=\"nav-item\">
-            <button class=\"nav-link {active}\" data-bs-toggle=\"tab\" data-bs-target=\"#{tab_id}\" type=\"button\" role=\"tab\" aria-selected=\"{selected}\">{tab['name']}</button>
-          </li>
-        """))
+        nav.append(TAB_NAV.fill(
+            active="active" if idx == 0 else "",
+            tab_id=tab_id,
+            selected="true" if idx == 0 else "false",
+            name=tab['name'],
+        ))
         table_html = render_table(tab.get('table', {})) if tab.get('table') else ''
-        content.append(dedent(f"""
-          <div class=\"tab-pane fade {show}\" id=\"{tab_id}\" role=\"tabpanel\">
-            <p class=\"text-muted\">{tab.get('description', 'Tab content goes here.')}</p>
-            {table_html}
-          </div>
-        """))
-    return dedent(f"""
-        <div class=\"card mb-3\">
-          <div class=\"card-header border-bottom-0 pb-0\">
-            <ul class=\"nav nav-tabs card-header-tabs\" role=\"tablist\">
-{''.join(nav)}
-            </ul>
-          </div>
-          <div class=\"card-body\">
-            <div class=\"tab-content\">
-{''.join(content)}
-            </div>
-          </div>
-        </div>
-    """)
+        pane = TAB_PANE_WITH_TABLE if table_html else TAB_PANE
+        content.append(pane.fill(
+            show="show active" if idx == 0 else "",
+            tab_id=tab_id,
+            description=tab.get('description', 'Tab content goes here.'),
+            table=table_html,
+        ))
+    return TABS.fill(nav="".join(nav), content="".join(content))
 
 
 def render_sidecards(sidecards: list[dict]) -> str:
-    blocks = []
-    for card in sidecards:
-        items = "".join(f"<li>{item}</li>" for item in card.get("items", []))
-        extra = card.get("extra", "")
-        blocks.append(dedent(f"""
-            <div class=\"card mb-3\">
-              <div class=\"card-header\">
-                <h5 class=\"card-title mb-0\">{card['title']}</h5>
-              </div>
-              <div class=\"card-body\">
-                <p class=\"text-muted small\">{card.get('description', '')}</p>
-                <ul class=\"small ps-3 mb-0\">{items}</ul>
-                {extra}
-              </div>
-            </div>
-        """))
-    return "".join(blocks)
+    return "".join(
+        SIDECARD.fill(
+            title=card['title'],
+            description=card.get('description', ''),
+            items="".join(f"<li>{item}</li>" for item in card.get("items", [])),
+            extra=card.get("extra", ""),
+        )
+        for card in sidecards
+    )
+
+
+def chart_series_attr(chart: dict) -> str:
+    if not chart.get("series"):
+        return ""
+    return f" data-series=\"{escape(json.dumps(chart['series'], separators=(',', ':')))}\""
 
 
 def render_charts(charts: list[dict]) -> str:
-    cards = []
-    for chart in charts:
-        cards.append(dedent(f"""
-            <div class=\"card mb-3\">
-              <div class=\"card-header\">
-                <h5 class=\"card-title mb-0\">{chart['title']}</h5>
-                <div class=\"text-muted small\">{chart.get('description', 'Hook chart library later')}</div>
-              </div>
-              <div class=\"card-body\">
-                <div class=\"chart-placeholder\" style=\"height: 220px; background: rgba(0,0,0,.04); border-radius: .5rem;\"></div>
-              </div>
-            </div>
-        """))
-    return "".join(cards)
+    return "".join(
+        CHART.fill(
+            title=chart['title'],
+            description=chart.get('description', 'Hook chart library later'),
+            series=chart_series_attr(chart),
+        )
+        for chart in charts
+    )
 
 
 def render_modals(modals: list[dict]) -> str:
-    blocks = []
-    for modal in modals:
-        blocks.append(dedent(f"""
-            <div class=\"modal fade\" tabindex=\"-1\" id=\"modal-{modal['id']}\" aria-hidden=\"true\">
-              <div class=\"modal-dialog modal-lg modal-dialog-centered\">
-                <div class=\"modal-content\">
-                  <div class=\"modal-header\">
-                    <h5 class=\"modal-title\">{modal['title']}</h5>
-                    <button type=\"button\" class=\"btn-close\" data-bs-dismiss=\"modal\" aria-label=\"Close\"></button>
-                  </div>
-                  <div class=\"modal-body\">
-                    <p class=\"text-muted\">{modal.get('description', 'Describe the form fields here.')}</p>
-                  </div>
-                  <div class=\"modal-footer\">
-                    <button type=\"button\" class=\"btn btn-outline-secondary\" data-bs-dismiss=\"modal\">Cancel</button>
-                    <button type=\"button\" class=\"btn btn-primary\">Save</button>
-                  </div>
-                </div>
-              </div>
-            </div>
-        """))
-    return "".join(blocks)
+    return "".join(
+        MODAL.fill(
+            id=modal['id'],
+            title=modal['title'],
+            description=modal.get('description', 'Describe the form fields here.'),
+        )
+        for modal in modals
+    )
 
 
 def render_page(spec: dict) -> str:
-    header = dedent(f"""
-        <div class=\"row mb-2 mb-xl-3\">
-          <div class=\"col-auto d-none d-sm-block\">
-            <h3 class=\"mb-0\"><strong>{spec['section']}</strong> / {spec['title']}</h3>
-            <div class=\"text-muted\">{spec['goal']}</div>
-          </div>
-        </div>
-    """)
+    header = PAGE_HEADER.fill(section=spec['section'], title=spec['title'], goal=spec['goal'])
 
-    cards = render_cards(spec.get('kpis', []))
+    cards = render_cards(spec.get('kpis', []), spec.get('kpi_rollups'))
     filters = render_filters(spec.get('filters', []))
-    actions = render_buttons(spec.get('actions', []))
+    actions = render_buttons(spec.get('actions', []), spec.get('export'))
     tabs = render_tabs(spec.get('tabs', []))
     table = render_table(spec.get('table', {})) if not tabs else ''
     charts = render_charts(spec.get('charts', []))
@@ -229,26 +399,8 @@ def render_page(spec: dict) -> str:
         charts,
     ])
 
-    if spec.get('layout', 'split') == 'full':
-        body = dedent(f"""
-            <div class=\"container-fluid p-0\">
-              {header}
-              {main}
-              {modals}
-            </div>
-        """)
-    else:
-        body = dedent(f"""
-            <div class=\"container-fluid p-0\">
-              {header}
-              <div class=\"row\">
-                <div class=\"col-xxl-9\">{main}</div>
-                <div class=\"col-xxl-3\">{sidecards}</div>
-              </div>
-              {modals}
-            </div>
-        """)
-    return "\n".join(line.rstrip() for line in body.splitlines()) + "\n"
+    page = PAGE_FULL if spec.get('layout', 'split') == 'full' else PAGE_SPLIT
+    return page.fill(header=header, main=main, sidecards=sidecards, modals=modals)
 
 
 SPEC: list[dict] = []
@@ -258,6 +410,306 @@ def add_spec(**kwargs):
     SPEC.append(kwargs)
 
 
+def as_of() -> datetime:
+    value = os.environ.get(AS_OF_ENV)
+    return datetime.fromisoformat(value) if value else datetime.now()
+
+
+def from_exports(*required: Path):
+    # Page data computed from data/*.csv exports. Until every required export
+    # exists the loader returns {} and its page keeps the placeholder values
+    # written in its spec.
+    def decorate(loader):
+        @wraps(loader)
+        def load(*args, **kwargs):
+            if not all(path.exists() for path in required):
+                return {}
+            return loader(*args, **kwargs)
+        return load
+    return decorate
+
+
+# Room and reservation exports for the vacancy forecast.
+FORECAST_ROOMS = ROOT / "data" / "rooms.csv"
+FORECAST_RESERVATIONS = ROOT / "data" / "reservations.csv"
+
+
+@from_exports(FORECAST_ROOMS, FORECAST_RESERVATIONS)
+def vacancy_forecast_data(start: date) -> dict:
+    import room_index
+    import vacancy_forecast
+
+    days = vacancy_forecast.forecast(
+        vacancy_forecast.load_reservations_csv(FORECAST_RESERVATIONS),
+        room_index.load_rooms_csv(FORECAST_ROOMS),
+        start,
+    )
+    cards = vacancy_forecast.summary(days)
+    return {
+        "kpis": [
+            {"label": "Forecasted occupancy", "value": cards["Forecasted occupancy"], "context": "Next 14 days"},
+            {"label": "Expected arrivals", "value": cards["Expected arrivals"], "context": "Next 14 days"},
+            {"label": "Expected departures", "value": cards["Expected departures"], "context": "Next 14 days"},
+            {"label": "Overbooking risk days", "value": cards["Overbooking risk days"], "context": ">95%", "badge": "bg-danger"},
+        ],
+        "chart": {"series": vacancy_forecast.chart_series(days)},
+        "table": {"rows": vacancy_forecast.table_rows(days)},
+        "warnings": [
+            f"{day.day:%b %d} - {'>95% occupancy' if day.risk == 'High' else 'Under capacity'}"
+            for day in days if day.risk in ("High", "Under capacity")
+        ][:5],
+    }
+
+
+# Staff, coverage and leave exports for the HR rota; leave is optional.
+SCHEDULE_STAFF = ROOT / "data" / "staff.csv"
+SCHEDULE_REQUIREMENTS = ROOT / "data" / "shift_requirements.csv"
+SCHEDULE_LEAVE = ROOT / "data" / "leave.csv"
+
+
+@from_exports(SCHEDULE_STAFF, SCHEDULE_REQUIREMENTS)
+def shift_schedule_data() -> dict:
+    import shift_schedule
+
+    leave = shift_schedule.load_leave_csv(SCHEDULE_LEAVE) if SCHEDULE_LEAVE.exists() else []
+    schedule = shift_schedule.Schedule(
+        shift_schedule.load_employees_csv(SCHEDULE_STAFF),
+        shift_schedule.load_requirements_csv(SCHEDULE_REQUIREMENTS),
+        leave,
+    )
+    cards = schedule.kpis(open_requests=sum(1 for item in leave if item.status == "Pending"))
+    return {
+        "kpis": [
+            {"label": "Shifts published", "value": str(cards["Shifts published"]), "context": "Current week"},
+            {"label": "Conflicts", "value": str(cards["Conflicts"]), "context": "Resolve before publish", "badge": "bg-danger"},
+            {"label": "Overtime risk", "value": str(cards["Overtime risk"]), "context": "Watch list"},
+            {"label": "Open requests", "value": str(cards["Open requests"]), "context": "Swap / leave"},
+        ],
+        "table": {
+            "title": "Shift grid",
+            "description": "Rows = employees, columns = days with shift codes.",
+            "columns": ["Employee"] + [f"{day:%a}" for day in schedule.days],
+            "rows": schedule.grid_rows(),
+        },
+        "summary": schedule.day_summary(),
+    }
+
+
+# Group presence, menu and recipe exports for the thal pipeline; adjustments
+# are optional.
+THAL_GROUPS = ROOT / "data" / "thal_groups.csv"
+THAL_MENU = ROOT / "data" / "menu.csv"
+THAL_RECIPES = ROOT / "data" / "recipes.csv"
+THAL_ADJUSTMENTS = ROOT / "data" / "thal_adjustments.csv"
+
+
+@from_exports(THAL_GROUPS, THAL_MENU, THAL_RECIPES)
+def thal_counts_data(day: date) -> dict:
+    import thal_counts
+
+    pipeline = thal_counts.ThalPipeline(
+        thal_counts.load_menu_csv(THAL_MENU),
+        thal_counts.load_recipes_csv(THAL_RECIPES),
+    )
+    if THAL_ADJUSTMENTS.exists():
+        for sh_no, when, meal, extra in thal_counts.load_adjustments_csv(THAL_ADJUSTMENTS):
+            pipeline.adjust(sh_no, when, meal, extra)
+    pipeline.load(thal_counts.load_presence_csv(THAL_GROUPS))
+    cards = pipeline.kpis(day)
+    return {
+        "counts": {
+            "kpis": [
+                {"label": "Total thals", "value": f"{cards['Total thals']:,}", "context": "Today"},
+                {"label": "Extra thals", "value": str(cards["Extra thals"]), "context": "Included"},
+                {"label": "Cancelled thals", "value": str(cards["Cancelled thals"]), "context": "Last update", "badge": "bg-warning"},
+            ],
+            "rows": pipeline.group_rows(day),
+        },
+        "kitchen": {
+            "kpis": [
+                {"label": "Total thals", "value": f"{pipeline.total(day, thal_counts.MEALS[0]):,}", "context": "Breakfast"},
+                {"label": "Total plates", "value": f"{cards['Total plates']:,}", "context": "All meals"},
+            ],
+            "rows": pipeline.dish_rows(day),
+        },
+    }
+
+
+# Hall opening times and the meal's arriving groups for the dining hall page.
+# The partial holds the queue as of the build; with the local stand-in
+# running, the page polls /dining/v1/queue for the live one.
+DINING_HALLS = ROOT / "data" / "dining_halls.csv"
+DINING_GROUPS = ROOT / "data" / "dining_groups.csv"
+
+
+@from_exports(DINING_HALLS, DINING_GROUPS)
+def dining_hall_data(now: datetime) -> dict:
+    import dining_slots
+
+    plan = dining_slots.plan_from_csv(DINING_HALLS, DINING_GROUPS, now)
+    cards = plan.kpis(now)
+    return {
+        "kpis": [
+            {"label": "Expected pax", "value": f"{cards['Expected pax']:,}", "context": "Lunch"},
+            {"label": "Seated", "value": f"{cards['Seated']:,}", "context": "Live"},
+            {"label": "Remaining capacity", "value": f"{cards['Remaining capacity']:,}", "context": "Across halls"},
+            {"label": "Waiting groups", "value": str(cards["Waiting groups"]), "context": "Queue", "badge": "bg-warning"},
+        ],
+        "rows": plan.session_rows(),
+        "timeline": plan.timeline(now),
+        "queue": "/dining/v1/queue",
+    }
+
+
+# Stock levels for the purchase plan; with the thal pipeline's menu, recipes
+# and group presence it drafts POs for the supply chain page.
+INVENTORY = ROOT / "data" / "inventory.csv"
+
+
+@from_exports(INVENTORY, THAL_GROUPS, THAL_MENU, THAL_RECIPES)
+def purchase_plan_data(today: date) -> dict:
+    import recipe_explosion
+    import thal_counts
+
+    demand = recipe_explosion.ingredient_demand(
+        {key: dishes for key, dishes in thal_counts.load_menu_csv(THAL_MENU).items() if key[0] >= today},
+        thal_counts.load_recipes_csv(THAL_RECIPES),
+        recipe_explosion.expected_pax(thal_counts.load_presence_csv(THAL_GROUPS)),
+    )
+    lines = recipe_explosion.purchase_requirements(demand, recipe_explosion.load_inventory_csv(INVENTORY))
+    return {
+        "rows": recipe_explosion.po_rows(lines, today),
+        "requirements": [
+            f"{line.needed_by:%b %d} · {line.item} · {line.order_qty:,.0f} {line.unit}".rstrip()
+            for line in lines
+        ][:5],
+    }
+
+
+# Journey trips and arriving groups, both with a `journey` column matching the
+# page slug.
+JOURNEY_TRIPS = ROOT / "data" / "journey_trips.csv"
+JOURNEY_GROUPS = ROOT / "data" / "journey_groups.csv"
+
+
+@from_exports(JOURNEY_TRIPS, JOURNEY_GROUPS)
+def journey_assignment_data(journey: str, now: datetime) -> dict:
+    import passenger_assign
+
+    plan = passenger_assign.plan_day(
+        passenger_assign.load_trips_csv(JOURNEY_TRIPS, journey),
+        passenger_assign.load_groups_csv(JOURNEY_GROUPS, journey),
+    )
+    cards = passenger_assign.journey_kpis(plan, now)
+    return {
+        "kpis": [
+            {"label": "Trips scheduled", "value": str(cards["Trips scheduled"]), "context": "Today"},
+            {"label": "Completed", "value": str(cards["Completed"]), "context": "On time"},
+            {"label": "Pax moved", "value": f"{cards['Pax moved']:,}", "context": "Today"},
+            {"label": "Delayed", "value": str(cards["Delayed"]), "context": "Investigate", "badge": "bg-warning"},
+        ],
+        "rows": passenger_assign.trip_rows(plan, now),
+        "unassigned": [f"{item.name} ({item.pax} pax): {item.reason}" for item in plan.unassigned][:5],
+    }
+
+
+# Pay profiles for the salaries page. Unpaid leave comes from the HR leave
+# export and overtime from the HR rota when those exist.
+PAYROLL_PROFILES = ROOT / "data" / "payroll.csv"
+
+
+@from_exports(PAYROLL_PROFILES)
+def payroll_data(today: date) -> dict:
+    import payroll
+    import shift_schedule
+
+    leave = shift_schedule.load_leave_csv(SCHEDULE_LEAVE) if SCHEDULE_LEAVE.exists() else []
+    overtime = {}
+    if SCHEDULE_STAFF.exists() and SCHEDULE_REQUIREMENTS.exists():
+        overtime = payroll.overtime_from_schedules([shift_schedule.Schedule(
+            shift_schedule.load_employees_csv(SCHEDULE_STAFF),
+            shift_schedule.load_requirements_csv(SCHEDULE_REQUIREMENTS),
+            leave,
+        )])
+    batch = payroll.PayrollBatch(
+        payroll.load_profiles_csv(PAYROLL_PROFILES),
+        payroll.unpaid_days(leave, today.year, today.month),
+        overtime,
+    )
+    cards = batch.kpis()
+    return {
+        "kpis": [
+            {"label": "Total payroll", "value": payroll.sar(cards["Total payroll"]), "context": "This month"},
+            {"label": "Paid %", "value": f"{cards['Paid %']}%", "context": "Updated daily"},
+            {"label": "Pending amount", "value": payroll.sar(cards["Pending amount"]), "context": "Awaiting approval"},
+            {"label": "Adjustments", "value": str(cards["Adjustments"]), "context": "This cycle"},
+        ],
+        "rows": batch.rows(),
+    }
+
+
+# Trip, driver and fleet exports for the transport roster.
+ROSTER_TRIPS = ROOT / "data" / "transport_trips.csv"
+ROSTER_DRIVERS = ROOT / "data" / "drivers.csv"
+ROSTER_VEHICLES = ROOT / "data" / "vehicles.csv"
+
+
+@from_exports(ROSTER_TRIPS, ROSTER_DRIVERS, ROSTER_VEHICLES)
+def transport_roster_data(today: date) -> dict:
+    import transport_roster
+
+    drivers = transport_roster.load_drivers_csv(ROSTER_DRIVERS)
+    vehicles = transport_roster.load_vehicles_csv(ROSTER_VEHICLES)
+    result = transport_roster.solve(transport_roster.load_trips_csv(ROSTER_TRIPS), drivers, vehicles)
+    cards = transport_roster.roster_kpis(result, vehicles, today)
+    return {
+        "kpis": [
+            {"label": "Trips today", "value": str(cards["Trips today"]), "context": "Scheduled"},
+            {"label": "Drivers on duty", "value": str(cards["Drivers on duty"]), "context": "Shift"},
+            {"label": "Vehicles available", "value": str(cards["Vehicles available"]), "context": "Ready"},
+            {"label": "Conflicts", "value": str(cards["Conflicts"]), "context": "Resolve quickly", "badge": "bg-danger"},
+        ],
+        "table": {
+            "title": "Driver roster",
+            "columns": ["Driver", "Trip ID", "Journey", "Time", "Vehicle"],
+            "rows": transport_roster.roster_rows(result, drivers),
+        },
+        "alerts": [f"{item.trip_id}: {item.reason}" for item in result.conflicts][:5],
+    }
+
+
+def kpi_rollup_source(page: str) -> str | None:
+    # Batched card endpoint for pages with cards declared in kpi_rollups.
+    import kpi_rollups
+
+    return f"/kpis/v1/{page}" if page in kpi_rollups.pages() else None
+
+
+def export_source(table: str, columns: dict[str, str], fmt: str = "csv", filename: str | None = None,
+                  **filters: str) -> str:
+    # Streamed download of `table` with columns given as {column: header};
+    # filters and order use the /rest/v1 syntax.
+    params = {"select": ",".join(columns), "headers": ",".join(columns.values()), **filters}
+    if filename:
+        params["filename"] = filename
+    return f"/export/v1/{table}.{fmt}?" + urlencode(params, safe=",().")
+
+
+def report_source(page: str) -> str | None:
+    # Cube endpoint for report pages declared in report_cubes.
+    import report_cubes
+
+    return f"/reports/v1/{page}" if page in report_cubes.REPORTS else None
+
+
+def server_side_table(view: str) -> dict:
+    # Wiring for a datatables_api view; the column list comes from the view so
+    # the page and the endpoint cannot drift apart.
+    import datatables_api
+
+    return {"url": f"/datatables/{view}", "columns": [column.data for column in datatables_api.VIEWS[view].columns]}
+
+
 def add_accommodation_specs():
     add_spec(
         file="accommodation-allocation.html",
@@ -322,6 +774,7 @@ def add_accommodation_specs():
         goal="Operational dashboard for arrivals and departures.",
         filters=["Date", "Building", "Status"],
         actions=["Bulk Check-in", "Bulk Check-out"],
+        kpi_rollups=kpi_rollup_source("accommodation-checkins-checkouts"),
         kpis=[
             {"label": "Expected arrivals", "value": "145", "context": "Today"},
             {"label": "Checked-in", "value": "86", "context": "+12 since 08:00"},
@@ -485,6 +938,7 @@ def add_accommodation_specs():
         ],
     )
 
+    forecast = vacancy_forecast_data(as_of().date())
     add_spec(
         file="accommodation-vacancy-forecast.html",
         section="Accommodation",
@@ -493,22 +947,23 @@ def add_accommodation_specs():
         layout="full",
         filters=["Date range", "Building", "View"],
         actions=["Export forecast", "Run what-if"],
-        kpis=[
+        kpis=forecast.get("kpis", [
             {"label": "Forecasted occupancy", "value": "82%", "context": "Next 14 days"},
             {"label": "Expected arrivals", "value": "860", "context": "Period"},
             {"label": "Expected departures", "value": "780", "context": "Period"},
             {"label": "Overbooking risk days", "value": "3", "context": ">95%", "badge": "bg-danger"},
-        ],
+        ]),
         charts=[
-            {"title": "Occupancy trend", "description": "Line / area chart of occupancy."},
+            {"title": "Occupancy trend", "description": "Line / area chart of occupancy.", **forecast.get("chart", {})},
         ],
         table={
             "title": "Forecast table",
             "columns": ["Date", "Rooms available", "Rooms reserved", "Arrivals", "Departures", "Risk"],
+            **forecast.get("table", {}),
         },
         sidecards=[
             {"title": "What-if scenario", "items": ["+40 rooms closed for maintenance", "+2 large group bookings"]},
-            {"title": "Warnings", "items": ["Nov 28 - >98% occupancy", "Dec 02 - Under capacity"]},
+            {"title": "Warnings", "items": forecast.get("warnings", ["Nov 28 - >98% occupancy", "Dec 02 - Under capacity"])},
         ],
     )
 
@@ -642,6 +1097,7 @@ def add_accounts_specs():
         ],
     )
 
+    salaries = payroll_data(as_of().date())
     add_spec(
         file="accounts-salaries.html",
         section="Accounts",
@@ -649,15 +1105,16 @@ def add_accounts_specs():
         goal="Handle payroll generation and disbursement status.",
         filters=["Month", "Department", "Status"],
         actions=["Generate payroll", "Mark as paid", "Export PDF"],
-        kpis=[
+        kpis=salaries.get("kpis", [
             {"label": "Total payroll", "value": "SAR 2.4M", "context": "This month"},
             {"label": "Paid %", "value": "68%", "context": "Updated daily"},
             {"label": "Pending amount", "value": "SAR 780k", "context": "Awaiting approval"},
             {"label": "Adjustments", "value": "34", "context": "This cycle"},
-        ],
+        ]),
         table={
             "title": "Payroll list",
             "columns": ["Employee", "Role", "Department", "Basic", "Allowances", "Deductions", "Net", "Status", "Payment date", "Actions"],
+            "rows": salaries.get("rows", []),
         },
         charts=[
             {"title": "Department wise cost", "description": "Bar chart for payroll distribution."},
@@ -709,6 +1166,7 @@ def add_hr_specs():
         ],
     )
 
+    rota = shift_schedule_data()
     add_spec(
         file="hr-scheduling.html",
         section="Human Resources",
@@ -716,13 +1174,14 @@ def add_hr_specs():
         goal="Plan shifts and detect conflicts.",
         filters=["Week", "Department", "Role"],
         actions=["Generate schedule", "Publish schedule"],
-        kpis=[
+        kpis=rota.get("kpis", [
             {"label": "Shifts published", "value": "182", "context": "Current week"},
             {"label": "Conflicts", "value": "4", "context": "Resolve before publish", "badge": "bg-danger"},
             {"label": "Overtime risk", "value": "6", "context": "Watch list"},
             {"label": "Open requests", "value": "12", "context": "Swap / leave"},
-        ],
-        extra=dedent("""
+        ]),
+        table=rota.get("table", {}),
+        extra="" if rota else dedent("""
             <div class="card mb-3">
               <div class="card-header">
                 <h5 class="card-title mb-0">Shift grid</h5>
@@ -771,7 +1230,7 @@ def add_hr_specs():
             </div>
         """),
         sidecards=[
-            {"title": "Day summary", "items": ["Mon: Required 58 / Assigned 56", "Tue: Required 60 / Assigned 61"]},
+            {"title": "Day summary", "items": rota.get("summary", ["Mon: Required 58 / Assigned 56", "Tue: Required 60 / Assigned 61"])},
         ],
         modals=[
             {"id": "edit-shift", "title": "Edit shift", "description": "Change shift type, add notes."},
@@ -837,6 +1296,10 @@ def add_hr_specs():
 
 
 def add_mawaid_specs():
+    now = as_of()
+    thals = thal_counts_data(now.date())
+    purchases = purchase_plan_data(now.date())
+    dining = dining_hall_data(now)
     add_spec(
         file="mawaid-dining-hall.html",
         section="Mawaid",
@@ -844,25 +1307,27 @@ def add_mawaid_specs():
         goal="Manage dining hall capacity and session status.",
         filters=["Date", "Meal type", "Location"],
         actions=["Assign hall & time", "Move group"],
-        kpis=[
+        kpis=dining.get("kpis", [
             {"label": "Expected pax", "value": "1,820", "context": "Lunch"},
             {"label": "Seated", "value": "1,240", "context": "Live"},
             {"label": "Remaining capacity", "value": "580", "context": "Across halls"},
             {"label": "Waiting groups", "value": "6", "context": "Queue", "badge": "bg-warning"},
-        ],
+        ]),
         table={
             "title": "Session table",
             "columns": ["Group / SH No.", "Pax", "Hall", "Slot", "Status", "Notes", "Actions"],
+            "rows": dining.get("rows", []),
+            "queue": dining.get("queue"),
         },
         charts=[
             {"title": "Expected vs actual seated", "description": "Live bar indicator."},
         ],
         sidecards=[
-            {"title": "Sessions timeline", "description": "Upcoming slots", "items": [
+            {"title": "Sessions timeline", "description": "Upcoming slots", "items": dining.get("timeline", [
                 "12:15 · Hall A · Capacity 400",
                 "12:45 · Hall B · Capacity 350",
                 "13:10 · Hall C · Capacity 280",
-            ]},
+            ])},
         ],
         modals=[
             {"id": "assign-hall", "title": "Assign hall & time", "description": "Select hall, slot, and status."},
@@ -906,15 +1371,17 @@ def add_mawaid_specs():
         goal="Kitchen production planning and execution.",
         filters=["Date", "Meal type", "Kitchen location"],
         actions=["Generate prep plan", "Update status", "Report shortage"],
-        kpis=[
+        kpis=thals.get("kitchen", {}).get("kpis", [
             {"label": "Total thals", "value": "640", "context": "Breakfast"},
             {"label": "Total plates", "value": "4,500", "context": "All meals"},
+        ]) + [
             {"label": "Veg / Non-veg split", "value": "60% / 40%", "context": "Current"},
             {"label": "Issues logged", "value": "5", "context": "Live issues"},
         ],
         table={
             "title": "Prep plan",
             "columns": ["Dish", "Planned qty", "Unit", "Status", "Responsible", "Notes", "Actions"],
+            "rows": thals.get("kitchen", {}).get("rows", []),
         },
         sidecards=[
             {"title": "Live issues", "items": ["Short on cumin seeds", "Kneading machine maintenance at 14:00"]},
@@ -932,6 +1399,7 @@ def add_mawaid_specs():
         goal="Manage master recipes and ingredients.",
         filters=["Search dish", "Category", "Tags"],
         actions=["New recipe", "Scale recipe"],
+        kpi_rollups=kpi_rollup_source("mawaid-make-recipies"),
         kpis=[
             {"label": "Total recipes", "value": "182", "context": "Active"},
             {"label": "Under testing", "value": "12", "context": "Draft"},
@@ -1016,6 +1484,11 @@ def add_mawaid_specs():
         goal="Analytical reports for production, cost, and waste.",
         filters=["Date range", "Building", "Meal type", "Vendor"],
         actions=["Export CSV", "Download PDF"],
+        export=export_source("slips", {
+            "building": "Building", "checkin_date": "Check-in date", "checkin_time": "Check-in time",
+            "checkout_date": "Check-out date", "checkout_time": "Check-out time", "gents": "Gents",
+            "ladies": "Ladies", "children": "Children", "infants": "Infants", "total": "Total",
+        }, filename="mawaid-slips", order="checkin_date.desc"),
         kpis=[
             {"label": "Food cost %", "value": "38%", "context": "Target 35%"},
             {"label": "Waste quantity", "value": "210 thals", "context": "Last week"},
@@ -1047,13 +1520,14 @@ def add_mawaid_specs():
         table={
             "title": "PO list",
             "columns": ["PO No.", "Date", "Supplier", "Items count", "Value", "Status", "Expected delivery", "Actions"],
+            "rows": purchases.get("rows", []),
         },
         charts=[
             {"title": "Ordered vs received", "description": "Bar chart per supplier"},
         ],
         sidecards=[
             {"title": "Next deliveries", "items": ["Nov 27 · Fresh Farms · Vegetables", "Nov 28 · Spice Hub · Dry goods"]},
-        ],
+        ] + ([{"title": "Purchase requirements", "items": purchases["requirements"]}] if purchases.get("requirements") else []),
         modals=[
             {"id": "create-po", "title": "Create PO", "description": "Supplier, item lines, delivery date."},
             {"id": "receive-items", "title": "Receive items", "description": "Capture delivered qty, short/excess."},
@@ -1067,15 +1541,17 @@ def add_mawaid_specs():
         goal="Manage thal and meal counts.",
         filters=["Date", "Meal type", "Group / Building"],
         actions=["Adjust thals", "Lock counts"],
-        kpis=[
+        kpis=thals.get("counts", {}).get("kpis", [
             {"label": "Total thals", "value": "642", "context": "Today"},
             {"label": "Extra thals", "value": "48", "context": "Included"},
             {"label": "Cancelled thals", "value": "14", "context": "Last update", "badge": "bg-warning"},
+        ]) + [
             {"label": "Locked", "value": "Yes", "context": "After freeze?"},
         ],
         table={
             "title": "Thal summary",
             "columns": ["Group / SH No.", "Pax", "Thals requested", "Extra", "Net", "Notes", "Actions"],
+            "rows": thals.get("counts", {}).get("rows", []),
         },
         charts=[
             {"title": "Thal trend", "description": "Line chart over day/week"},
@@ -1124,6 +1600,7 @@ def add_reservations_specs():
         goal="List of approved reservations ready for processing.",
         filters=["Date range", "Type", "Status"],
         actions=["Download confirmations", "Send message"],
+        kpi_rollups=kpi_rollup_source("reservations-approved"),
         kpis=[
             {"label": "Approved today", "value": "32", "context": "New"},
             {"label": "Arriving within 48h", "value": "18", "context": "Prepare"},
@@ -1133,6 +1610,7 @@ def add_reservations_specs():
         table={
             "title": "Approved reservations",
             "columns": ["Ref no", "Guest / Group", "Pax", "Dates", "Package", "Source", "Status", "Actions"],
+            "server_side": server_side_table("reservations-approved"),
         },
         sidecards=[
             {"title": "Actions", "items": ["Convert to check-in batch", "Download manifest"]},
@@ -1335,6 +1813,7 @@ def add_reservations_specs():
         goal="Work queue of pending reservations awaiting action.",
         filters=["Source", "Age", "Risk"],
         actions=["Approve", "Reject", "Request info"],
+        kpi_rollups=kpi_rollup_source("reservations-pending"),
         kpis=[
             {"label": "Total pending", "value": "54", "context": "Queue"},
             {"label": ">3 days old", "value": "12", "context": "Escalate", "badge": "bg-danger"},
@@ -1344,6 +1823,7 @@ def add_reservations_specs():
         table={
             "title": "Pending reservations",
             "columns": ["Ref", "Guest / Group", "Date requested", "Age", "Source", "Notes", "Actions"],
+            "server_side": server_side_table("reservations-pending"),
         },
         sidecards=[
             {"title": "Tips", "items": ["Use request info to gather missing documents", "Tag high risk bookings"]},
@@ -1385,8 +1865,10 @@ def add_transport_specs():
         ("transport-journeys-ziyarah.html", "Journeys / Ziyarah", "Ziyarah excursions."),
     ]
 
+    now = as_of()
     for file_name, title, goal in journey_variants:
         slug = title.split("/")[-1].strip().lower()
+        plan = journey_assignment_data(slug, now)
         add_spec(
             file=file_name,
             section="Transport",
@@ -1394,25 +1876,27 @@ def add_transport_specs():
             goal=goal,
             filters=["Date", "Route", "Vehicle type", "Status"],
             actions=["Create trip", "Assign passengers"],
-            kpis=[
+            kpis=plan.get("kpis", [
                 {"label": "Trips scheduled", "value": "28", "context": "Today"},
                 {"label": "Completed", "value": "12", "context": "On time"},
                 {"label": "Pax moved", "value": "1,240", "context": "Today"},
                 {"label": "Delayed", "value": "3", "context": "Investigate", "badge": "bg-warning"},
-            ],
+            ]),
             table={
                 "title": "Trip list",
                 "columns": ["Trip ID", "Date / Time", "Route", "Vehicle", "Driver", "Pax booked", "Status", "Actions"],
+                "rows": plan.get("rows", []),
             },
             sidecards=[
                 {"title": "Notes", "items": ["Use drawer for passenger manifest", "Mark trip delayed with reason"]},
-            ],
+            ] + ([{"title": "Unassigned groups", "items": plan["unassigned"]}] if plan.get("unassigned") else []),
             modals=[
                 {"id": f"create-trip-{slug}", "title": "Create trip", "description": "Route, capacity, pickup points."},
                 {"id": f"assign-passengers-{slug}", "title": "Assign passengers", "description": "Multi-select groups."},
             ],
         )
 
+    roster = transport_roster_data(now.date())
     add_spec(
         file="transport-roster.html",
         section="Transport",
@@ -1420,13 +1904,14 @@ def add_transport_specs():
         goal="Driver & vehicle roster schedule.",
         filters=["Date", "Journey type"],
         actions=["Reassign trip", "Block vehicle"],
-        kpis=[
+        table=roster.get("table", {}),
+        kpis=roster.get("kpis", [
             {"label": "Trips today", "value": "62", "context": "Scheduled"},
             {"label": "Drivers on duty", "value": "44", "context": "Shift"},
             {"label": "Vehicles available", "value": "58", "context": "Ready"},
             {"label": "Conflicts", "value": "2", "context": "Resolve quickly", "badge": "bg-danger"},
-        ],
-        extra=dedent("""
+        ]),
+        extra="" if roster else dedent("""
             <div class="card mb-3">
               <div class="card-header">
                 <h5 class="card-title mb-0">Roster timeline</h5>
@@ -1466,7 +1951,7 @@ def add_transport_specs():
             </div>
         """),
         sidecards=[
-            {"title": "Alerts", "items": ["Vehicle BUS-12 due service", "Driver Hamid on sick leave"]},
+            {"title": "Alerts", "items": roster.get("alerts", ["Vehicle BUS-12 due service", "Driver Hamid on sick leave"])},
         ],
     )
 
@@ -1496,6 +1981,22 @@ def add_transport_specs():
     )
 
 
+# Raw rows behind a report's "Download" action, for reports backed by a table.
+REPORT_EXPORTS = {
+    "report-reservations.html": dict(
+        table="reservations_individuals",
+        columns={
+            "ref_no": "Ref no", "its_no": "ITS no", "full_name": "Guest", "group_name": "Group",
+            "arrival_date": "Arrival", "departure_date": "Departure", "total_pax": "Pax",
+            "package_code": "Package", "source": "Source", "status": "Status", "created_at": "Created",
+        },
+        fmt="xlsx",
+        filename="reservations",
+        order="created_at.desc",
+    ),
+}
+
+
 def add_report_specs():
     report_variants = [
         ("report-accommodation.html", "Accommodation Report", "Occupancy %, ADR, and turnaways.", ["Date range", "Building", "Room type"], ["Occupancy %", "Rooms vacant", "ADR"], ["Date", "Rooms occupied", "Rooms vacant", "Turnaways", "Overbookings"]),
@@ -1517,7 +2018,9 @@ def add_report_specs():
             layout="full",
             filters=filters,
             actions=["Apply filters", "Download"],
+            export=export_source(**REPORT_EXPORTS[file_name]) if file_name in REPORT_EXPORTS else None,
             kpis=[{"label": label, "value": "—", "context": "TBD"} for label in summary_labels],
+            kpi_rollups=kpi_rollup_source(file_name.removesuffix(".html")),
             charts=[
                 {"title": f"{title} chart 1", "description": "Chart placeholder"},
                 {"title": f"{title} chart 2", "description": "Chart placeholder"},
@@ -1525,6 +2028,7 @@ def add_report_specs():
             table={
                 "title": "Aggregated table",
                 "columns": table_cols,
+                "report": report_source(file_name.removesuffix(".html")),
             },
         )
 
@@ -1671,28 +2175,387 @@ def add_settings_users_specs():
     )
 
 
-def build_spec_from_plan():
-    add_accommodation_specs()
-    add_accounts_specs()
-    add_hr_specs()
-    add_mawaid_specs()
-    add_reservations_specs()
-    add_transport_specs()
-    add_report_specs()
-    add_settings_users_specs()
+# Sections register lazily: nothing is built at import, and each section's
+# add_*_specs() runs at most once, the first time load_specs() asks for it.
+SECTIONS = {
+    "accommodation": add_accommodation_specs,
+    "accounts": add_accounts_specs,
+    "hr": add_hr_specs,
+    "mawaid": add_mawaid_specs,
+    "reservations": add_reservations_specs,
+    "transport": add_transport_specs,
+    "reports": add_report_specs,
+    "settings": add_settings_users_specs,
+}
+_SECTION_SPECS: dict[str, list[dict]] = {}
 
 
-build_spec_from_plan()
+def section_specs(name: str) -> list[dict]:
+    if name not in SECTIONS:
+        raise KeyError(f"Unknown section {name!r}; expected one of {', '.join(SECTIONS)}")
+    if name not in _SECTION_SPECS:
+        start = len(SPEC)
+        SECTIONS[name]()
+        _SECTION_SPECS[name] = SPEC[start:]
+    return _SECTION_SPECS[name]
 
 
-def build():
+def load_specs(sections=None) -> list[dict]:
+    names = list(SECTIONS) if sections is None else sections
+    return [spec for name in names for spec in section_specs(name)]
+
+
+def build_spec_from_plan():
+    return load_specs()
+
+
+# Spec keys mapped to the helpers render_page() calls for them. render_page
+# itself is hashed for every spec; a key only pulls in its helpers when set.
+SPEC_RENDERERS = {
+    "kpis": (render_cards, render_badge),
+    "filters": (render_filters,),
+    "actions": (render_buttons,),
+    "tabs": (render_tabs, render_table, table_attrs),
+    "table": (render_table, table_attrs),
+    "charts": (render_charts, chart_series_attr),
+    "sidecards": (render_sidecards,),
+    "modals": (render_modals,),
+}
+
+
+def code_names(code) -> list[str]:
+    # Comprehensions and lambdas compile to nested code objects with their
+    # own co_names, so a template used only inside one is found there.
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names.extend(code_names(const))
+    return names
+
+
+@lru_cache(maxsize=None)
+def renderer_source(func) -> str:
+    parts = [inspect.getsource(func)]
+    for name in dict.fromkeys(code_names(func.__code__)):
+        template = globals().get(name)
+        if isinstance(template, Template):
+            parts.append(template.source)
+    return "".join(parts)
+
+
+# Code every page goes through whatever its keys: the Template class and the
+# slot patterns it compiles with. Any change here re-renders every spec.
+@lru_cache(maxsize=None)
+def build_salt() -> str:
+    return "".join([inspect.getsource(Template), repr(_SLOT), repr(_WHITESPACE_ONLY)])
+
+
+def spec_hash(spec: dict, minify: bool = False) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps(spec, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    digest.update(build_salt().encode("utf-8"))
+    if minify:
+        digest.update(minifier_source().encode("utf-8"))
+    renderers = {render_page}
+    for key, funcs in SPEC_RENDERERS.items():
+        if spec.get(key):
+            renderers.update(funcs)
+    for func in sorted(renderers, key=lambda f: f.__name__):
+        digest.update(renderer_source(func).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_manifest() -> dict:
+    if not MANIFEST.exists():
+        return {}
+    try:
+        return json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest: dict) -> None:
+    MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+# Elements whose surrounding whitespace never renders. Inline and
+# inline-block ones (button, input, label, select, ...) keep a single space
+# between them, as the browser would show it.
+BLOCK_TAGS = {
+    "div", "form", "h1", "h2", "h3", "h4", "h5", "h6", "li", "nav", "ol",
+    "p", "table", "tbody", "td", "th", "thead", "tr", "ul",
+}
+RAW_BLOCK = re.compile(r"(<(pre|script|style|textarea)\b.*?</\2\s*>)", re.DOTALL | re.IGNORECASE)
+GENERATED_BANNER = re.compile(r"<!--\s*Generated\b.*?-->\s*", re.DOTALL)
+# A tag or comment, with quoted attribute values kept whole so a ">" or
+# whitespace inside them is left alone.
+MARKUP = re.compile(r"""(<[^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*>)""")
+TAG_NAME = re.compile(r"</?([a-zA-Z][\w-]*)")
+TEXT_SPACE = re.compile(r"\s+")
+QUOTED_ATTR = re.compile(r"""(\s[\w:-]+)="([^\s"'=<>`/]+)\"""")
+
+
+def _is_block(markup: str) -> bool:
+    match = TAG_NAME.match(markup)
+    return bool(match) and match.group(1).lower() in BLOCK_TAGS
+
+
+def _minify_markup(text: str) -> str:
+    # split() yields text, markup, text, ...; only text between tags is
+    # collapsed, and whitespace-only text next to a block element dropped.
+    pieces = MARKUP.split(text)
+    for idx in range(0, len(pieces), 2):
+        piece = TEXT_SPACE.sub(" ", pieces[idx])
+        if piece == " " and 0 < idx < len(pieces) - 1 and (_is_block(pieces[idx - 1]) or _is_block(pieces[idx + 1])):
+            piece = ""
+        pieces[idx] = piece
+    for idx in range(1, len(pieces), 2):
+        if TAG_NAME.match(pieces[idx]):
+            pieces[idx] = QUOTED_ATTR.sub(r"\1=\2", pieces[idx])
+    return "".join(pieces)
+
+
+def minify_html(html: str) -> str:
+    html = GENERATED_BANNER.sub("", html)
+    chunks = RAW_BLOCK.split(html)
+    out = []
+    # split() with two groups yields text, raw block, tag name, text, ...
+    for idx in range(0, len(chunks), 3):
+        out.append(_minify_markup(chunks[idx]))
+        if idx + 1 < len(chunks):
+            out.append(chunks[idx + 1])
+    return "".join(out).strip() + "\n"
+
+
+@lru_cache(maxsize=None)
+def minifier_source() -> str:
+    parts = [inspect.getsource(func) for func in (minify_html, _minify_markup, _is_block)]
+    parts.extend(sorted(BLOCK_TAGS))
+    parts.extend(repr(regex) for regex in (RAW_BLOCK, GENERATED_BANNER, MARKUP, TAG_NAME, TEXT_SPACE, QUOTED_ATTR))
+    return "".join(parts)
+
+
+def write_page(spec: dict, minify: bool = False) -> tuple[Path, int, int]:
+    target = PARTIALS / spec['file']
+    html = render_page(spec)
+    before = len(html.encode("utf-8"))
+    if minify:
+        html = minify_html(html)
+    target.write_text(html, encoding='utf-8')
+    return target, before, len(html.encode("utf-8"))
+
+
+def print_size_table(results: list[tuple[Path, int, int]]) -> None:
+    width = max(len(target.name) for target, _, _ in results)
+    print(f"{'Page':<{width}}  {'Before':>9}  {'After':>9}  {'Saved':>6}")
+    for target, before, after in results:
+        print(f"{target.name:<{width}}  {before:>9,}  {after:>9,}  {1 - after / before:>6.1%}")
+    total_before = sum(before for _, before, _ in results)
+    total_after = sum(after for _, _, after in results)
+    print(f"{'Total':<{width}}  {total_before:>9,}  {total_after:>9,}  {1 - total_after / total_before:>6.1%}")
+
+
+def build(incremental: bool = False, jobs: int = 1, minify: bool = False, sections=None, bundle: bool = False):
     PARTIALS.mkdir(exist_ok=True)
-    for spec in SPEC:
-        html = render_page(spec)
-        target = PARTIALS / spec['file']
-        target.write_text(html, encoding='utf-8')
+    manifest = load_manifest() if incremental or sections is not None else {}
+    pending, skipped = [], []
+    for spec in load_specs(sections):
+        digest = spec_hash(spec, minify=minify)
+        if incremental and manifest.get(spec['file']) == digest and (PARTIALS / spec['file']).exists():
+            skipped.append(spec['file'])
+            continue
+        manifest[spec['file']] = digest
+        pending.append(spec)
+    render = partial(write_page, minify=minify)
+    if jobs > 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(render, pending, chunksize=max(1, len(pending) // (jobs * 4))))
+    else:
+        results = [render(spec) for spec in pending]
+    for target, _, _ in results:
         print(f"Wrote {target.relative_to(ROOT)}")
+    if minify and results:
+        print_size_table(results)
+    save_manifest(manifest)
+    rebuilt = [spec['file'] for spec in pending]
+    # Once index-spa.html points at a bundle it is served ahead of the
+    # partials, so it has to follow every rebuild.
+    if bundle or (rebuilt and bundle_enabled()):
+        build_bundle(sections)
+    if incremental:
+        print(f"Rebuilt {len(rebuilt)}, skipped {len(skipped)} unchanged")
+    return rebuilt, skipped
+
+
+def check_parity() -> list[str]:
+    import reference_render
+
+    return [spec['file'] for spec in load_specs() if render_page(spec) != reference_render.render_page(spec)]
+
+
+def bundle_enabled() -> bool:
+    match = BUNDLE_META.search(SPA_INDEX.read_text(encoding="utf-8"))
+    return bool(match and match.group(2))
+
+
+def build_bundle(sections=None) -> Path:
+    # With sections, only their pages are re-read and the rest carried over
+    # from the current bundle, so the other sections are never loaded.
+    pages = {}
+    current = BUNDLE_META.search(SPA_INDEX.read_text(encoding="utf-8"))
+    if sections is not None and current and (ROOT / current.group(2)).is_file():
+        pages = json.loads((ROOT / current.group(2)).read_text(encoding="utf-8"))
+    pages.update(
+        (spec['file'].removesuffix(".html"), (PARTIALS / spec['file']).read_text(encoding="utf-8"))
+        for spec in load_specs(sections)
+    )
+    payload = json.dumps(pages, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    fingerprint = hashlib.sha256(payload).hexdigest()[:12]
+    target = PARTIALS / f"bundle.{fingerprint}.json"
+    for stale in PARTIALS.glob("bundle.*.json*"):
+        if not stale.name.startswith(target.name):
+            stale.unlink()
+    target.write_bytes(payload)
+    target.with_name(target.name + ".gz").write_bytes(gzip.compress(payload, compresslevel=9, mtime=0))
+    if brotli is not None:
+        target.with_name(target.name + ".br").write_bytes(brotli.compress(payload, quality=11))
+    html = SPA_INDEX.read_text(encoding="utf-8")
+    updated = BUNDLE_META.sub(rf"\g<1>partials/{target.name}\g<3>", html)
+    if updated != html:
+        SPA_INDEX.write_text(updated, encoding="utf-8")
+    print(f"Wrote {target.relative_to(ROOT)} ({len(pages)} modules, {len(payload):,} bytes)")
+    return target
+
+
+def write_hashed_partials(sections=None) -> dict:
+    manifest = {}
+    if sections is not None and HASHED_MANIFEST.exists():
+        manifest = json.loads(HASHED_MANIFEST.read_text(encoding="utf-8"))
+    for spec in load_specs(sections):
+        source = PARTIALS / spec['file']
+        content = source.read_bytes()
+        hashed = f"{source.stem}.{hashlib.sha256(content).hexdigest()[:10]}.html"
+        # Older hashed copies go, along with their .gz/.br siblings.
+        for stale in PARTIALS.glob(f"{source.stem}.*.html*"):
+            match = re.fullmatch(rf"{re.escape(source.stem)}\.[0-9a-f]{{10}}\.html(?:\.gz|\.br)?", stale.name)
+            if match and not stale.name.startswith(hashed):
+                stale.unlink()
+        target = PARTIALS / hashed
+        if not target.exists():
+            target.write_bytes(content)
+        manifest[spec['file']] = hashed
+    HASHED_MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    def rewrite(match):
+        return f'data-partial="partials/{manifest.get(match.group(1) + ".html", match.group(1) + ".html")}"'
+
+    html = SPA_INDEX.read_text(encoding="utf-8")
+    updated = DATA_PARTIAL.sub(rewrite, html)
+    if updated != html:
+        SPA_INDEX.write_text(updated, encoding="utf-8")
+    print(f"Wrote {HASHED_MANIFEST.relative_to(ROOT)} ({len(manifest)} hashed partials)")
+    return manifest
+
+
+def compress_file(source: Path) -> list[Path]:
+    data = None
+    written = []
+    encoders = [(".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encoders.append((".br", lambda raw: brotli.compress(raw, quality=11)))
+    source_mtime = source.stat().st_mtime_ns
+    for suffix, encode in encoders:
+        sibling = source.with_name(source.name + suffix)
+        if sibling.exists() and sibling.stat().st_mtime_ns >= source_mtime:
+            continue
+        if data is None:
+            data = source.read_bytes()
+        sibling.write_bytes(encode(data))
+        written.append(sibling)
+    return written
+
+
+def compress_assets(threshold: int = COMPRESS_THRESHOLD, sections=None) -> list[Path]:
+    pages = [spec['file'] for spec in load_specs(sections)]
+    sources = [PARTIALS / page for page in pages]
+    # The content-hashed copies are what the SPA fetches once --hashed has run.
+    if HASHED_MANIFEST.exists():
+        hashed = json.loads(HASHED_MANIFEST.read_text(encoding="utf-8"))
+        sources.extend(PARTIALS / name for name in sorted(hashed[page] for page in pages if page in hashed))
+    for directory, pattern in STATIC_ASSETS:
+        sources.extend(sorted(directory.glob(pattern)))
+    written = []
+    skipped = 0
+    for source in sources:
+        if not source.exists() or source.stat().st_size < threshold:
+            continue
+        siblings = compress_file(source)
+        if not siblings:
+            skipped += 1
+        written.extend(siblings)
+    encodings = "gzip + brotli" if brotli is not None else "gzip (install brotli for .br)"
+    print(f"Compressed {len(written)} file(s) with {encodings}, {skipped} already up to date")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate UMS partials from the plan specs.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-render specs whose content hash changed since the last build")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="render and write pages across N worker processes")
+    parser.add_argument("--only", type=lambda value: [name.strip() for name in value.split(",") if name.strip()],
+                        metavar="SECTIONS",
+                        help=f"comma-separated sections to build ({', '.join(SECTIONS)}); default all. "
+                             f"--hashed, --bundle and --compress then only touch these sections' pages")
+    parser.add_argument("--minify", action="store_true",
+                        help="collapse whitespace and redundant attribute quotes in the written partials")
+    parser.add_argument("--compress", action="store_true",
+                        help="write .gz/.br siblings for partials and css/js assets that changed")
+    parser.add_argument("--compress-threshold", type=int, default=COMPRESS_THRESHOLD,
+                        help="skip files smaller than this many bytes when compressing")
+    parser.add_argument("--hashed", action="store_true",
+                        help="also write content-hashed partials/<name>.<hash>.html, partials/manifest.json "
+                             "and point index-spa.html at them")
+    parser.add_argument("--bundle", action="store_true",
+                        help="also write a fingerprinted partials/bundle.<hash>.json for index-spa.html; "
+                             "later builds keep it current")
+    parser.add_argument("--watch", action="store_true",
+                        help="serve the repo root and rebuild changed specs on every edit")
+    parser.add_argument("--port", type=int, default=8000, help="dev server port for --watch")
+    parser.add_argument("--check-parity", action="store_true",
+                        help="compare compiled templates against the reference dedent renderers and exit")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, metavar="DATE",
+                        help=f"date (or date and time) pages built from data/*.csv exports are computed for; "
+                             f"default ${AS_OF_ENV}, else now")
+    args = parser.parse_args(argv)
+    if args.as_of:
+        # Through the environment so --jobs workers see it too.
+        os.environ[AS_OF_ENV] = args.as_of.isoformat()
+    unknown = [name for name in args.only or [] if name not in SECTIONS]
+    if unknown:
+        parser.error(f"unknown section(s) {', '.join(unknown)}; choose from {', '.join(SECTIONS)}")
+    if args.check_parity:
+        mismatched = check_parity()
+        for name in mismatched:
+            print(f"Mismatch: {name}")
+        total = len(load_specs())
+        print(f"{total - len(mismatched)}/{total} pages match the reference renderers")
+        raise SystemExit(1 if mismatched else 0)
+    if args.watch:
+        import watch_partials
+
+        watch_partials.watch(port=args.port)
+        return
+    build(incremental=args.incremental, jobs=max(1, args.jobs), minify=args.minify, sections=args.only,
+          bundle=args.bundle)
+    if args.hashed:
+        write_hashed_partials(sections=args.only)
+    if args.compress:
+        compress_assets(threshold=args.compress_threshold, sections=args.only)
 
 
 if __name__ == "__main__":
-    build()
+    main()
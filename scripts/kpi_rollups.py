@@ -0,0 +1,212 @@
+from __future__ import annotations
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+ON_WRITE = "on_write"
+PERIODIC = "periodic"
+# COUNT and SUM can be maintained from the rows a write touches; any other
+# on-write aggregate is recomputed in full after each write to its table.
+_ADDITIVE = re.compile(r"(COUNT|SUM)\([^()]*\)", re.IGNORECASE)
+_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now'"
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kpi_rollups (
+    page TEXT NOT NULL,
+    label TEXT NOT NULL,
+    value REAL,
+    computed_at TEXT,
+    compute_ms REAL,
+    PRIMARY KEY (page, label)
+)
+"""
+
+
+@dataclass(frozen=True)
+class Kpi:
+    page: str
+    label: str
+    table: str
+    aggregate: str = "COUNT(*)"
+    where: str = "1"
+    policy: str = ON_WRITE
+    # Seconds between refreshes, for periodic cards.
+    every: int = 300
+    fmt: str = "{:,.0f}"
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.page, self.label
+
+    @property
+    def additive(self) -> bool:
+        return self.policy == ON_WRITE and _ADDITIVE.fullmatch(self.aggregate) is not None
+
+
+@dataclass(frozen=True)
+class Rollup:
+    value: float
+    computed_at: str
+    compute_ms: float
+
+
+PENDING = "status IN ('pending', 'awaiting_payment')"
+
+# Cards backed by tables in the local database, keyed by partial name and card
+# label. Cards whose data lives elsewhere keep their generated values.
+KPIS = [
+    Kpi("reservations-pending", "Total pending", "reservations_individuals", where=PENDING),
+    Kpi("reservations-pending", ">3 days old", "reservations_individuals",
+        where=f"{PENDING} AND created_at < {_NOW}, '-3 days')", policy=PERIODIC),
+    Kpi("reservations-approved", "Arriving within 48h", "reservations_individuals",
+        where="status = 'approved' AND arrival_date BETWEEN date('now') AND date('now', '+2 days')",
+        policy=PERIODIC),
+    Kpi("mawaid-make-recipies", "Total recipes", "mawaid_recipes"),
+    Kpi("mawaid-make-recipies", "Recently updated", "mawaid_recipes",
+        where=f"created_at >= {_NOW}, '-7 days')", policy=PERIODIC, every=3600),
+    Kpi("mawaid-make-recipies", "Ingredients per recipe", "mawaid_recipes",
+        aggregate="AVG(json_array_length(ingredients))", where="json_valid(ingredients)", fmt="{:.0f} avg"),
+    Kpi("accommodation-checkins-checkouts", "Expected arrivals", "slips",
+        aggregate="SUM(total)", where="checkin_date = date('now')", policy=PERIODIC, every=60),
+    Kpi("accommodation-checkins-checkouts", "Expected departures", "slips",
+        aggregate="SUM(total)", where="checkout_date = date('now')", policy=PERIODIC, every=60),
+    Kpi("report-reservations", "Bookings", "reservations_individuals"),
+]
+
+
+def pages(kpis=KPIS) -> set[str]:
+    return {kpi.page for kpi in kpis}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class KpiService:
+    # Card values kept in memory and mirrored to kpi_rollups. On-write cards
+    # are updated inside the writer's transaction from the rows it touched
+    # (contributions before the write subtracted from those after it);
+    # periodic cards are recomputed by refresh_due() once they are older than
+    # their interval. Reads never touch the database.
+    def __init__(self, kpis=KPIS):
+        self.kpis = {kpi.key: kpi for kpi in kpis}
+        self.values: dict[tuple[str, str], Rollup] = {}
+        self._lock = threading.Lock()
+
+    def start(self, db: sqlite3.Connection) -> None:
+        # Writes made outside the service (seeding, imports) are not tracked,
+        # so every card is recomputed once at startup.
+        db.execute(ROLLUP_SCHEMA)
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            fresh = {kpi.key: self._compute(db, kpi) for kpi in self.kpis.values()}
+            self._persist(db, fresh)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.values.update(fresh)
+
+    def _compute(self, db: sqlite3.Connection, kpi: Kpi) -> Rollup:
+        started = time.perf_counter()
+        value = db.execute(f'SELECT {kpi.aggregate} FROM "{kpi.table}" WHERE {kpi.where}').fetchone()[0]
+        return Rollup(value or 0, _now(), (time.perf_counter() - started) * 1000)
+
+    def _persist(self, db: sqlite3.Connection, rollups: dict) -> None:
+        db.executemany(
+            "INSERT OR REPLACE INTO kpi_rollups (page, label, value, computed_at, compute_ms) VALUES (?, ?, ?, ?, ?)",
+            [(page, label, rollup.value, rollup.computed_at, rollup.compute_ms) for (page, label), rollup in rollups.items()],
+        )
+
+    def contributions(self, db: sqlite3.Connection, table: str, rowids: list[int]) -> dict[tuple[str, str], float]:
+        # One pass over the touched rows for every additive card on `table`.
+        additive = [kpi for kpi in self.kpis.values() if kpi.table == table and kpi.additive]
+        if not additive or not rowids:
+            return {}
+        columns = ", ".join(f"{kpi.aggregate} FILTER (WHERE {kpi.where})" for kpi in additive)
+        row = db.execute(
+            f'SELECT {columns} FROM "{table}" WHERE rowid IN (SELECT value FROM json_each(?))',
+            [json.dumps(rowids)],
+        ).fetchone()
+        return {kpi.key: value or 0 for kpi, value in zip(additive, row)}
+
+    def apply_write(self, db: sqlite3.Connection, table: str, rowids: list[int], before: dict) -> dict:
+        # Call inside the write transaction, after the write; pass the result
+        # to publish() once it has committed.
+        started = time.perf_counter()
+        after = self.contributions(db, table, rowids)
+        elapsed = (time.perf_counter() - started) * 1000
+        updates, stamp = {}, _now()
+        for key in after.keys() | before.keys():
+            delta = after.get(key, 0) - before.get(key, 0)
+            if delta:
+                updates[key] = ("delta", delta, stamp, elapsed)
+        db.executemany(
+            "UPDATE kpi_rollups SET value = value + ?, computed_at = ?, compute_ms = ? WHERE page = ? AND label = ?",
+            [(delta, stamp, ms, page, label) for (page, label), (_, delta, stamp, ms) in updates.items()],
+        )
+        full = {
+            kpi.key: self._compute(db, kpi) for kpi in self.kpis.values()
+            if kpi.table == table and kpi.policy == ON_WRITE and not kpi.additive
+        }
+        self._persist(db, full)
+        updates.update({key: ("set", rollup) for key, rollup in full.items()})
+        return updates
+
+    def publish(self, updates: dict) -> None:
+        with self._lock:
+            for key, update in updates.items():
+                if update[0] == "set":
+                    self.values[key] = update[1]
+                else:
+                    _, delta, stamp, ms = update
+                    current = self.values.get(key)
+                    self.values[key] = Rollup((current.value if current else 0) + delta, stamp, ms)
+
+    def refresh_due(self, db: sqlite3.Connection, now: datetime | None = None) -> list[tuple[str, str]]:
+        now = now or datetime.now(timezone.utc)
+        due = []
+        for kpi in self.kpis.values():
+            current = self.values.get(kpi.key)
+            if kpi.policy != PERIODIC or current is None:
+                continue
+            computed = datetime.strptime(current.computed_at, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+            if now - computed >= timedelta(seconds=kpi.every):
+                due.append(kpi)
+        if not due:
+            return []
+        fresh = {kpi.key: self._compute(db, kpi) for kpi in due}
+        self._persist(db, fresh)
+        with self._lock:
+            self.values.update(fresh)
+        return list(fresh)
+
+    def page(self, page: str) -> list[dict]:
+        # Everything one page needs in a single response, in declaration order.
+        with self._lock:
+            found = [(kpi, self.values.get(kpi.key)) for kpi in self.kpis.values() if kpi.page == page]
+        return [
+            {
+                "label": kpi.label,
+                "value": kpi.fmt.format(rollup.value),
+                "raw": rollup.value,
+                "policy": kpi.policy,
+                "computed_at": rollup.computed_at,
+                "compute_ms": round(rollup.compute_ms, 3),
+            }
+            for kpi, rollup in found if rollup is not None
+        ]
+
+
+def refresh_loop(service: KpiService, db: sqlite3.Connection, interval: float = 30.0) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            service.refresh_due(db)
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,607 @@
+from __future__ import annotations
+import argparse
+import json
+import random
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import datatables_api
+import dining_slots
+import export_service
+import kpi_rollups
+import report_cubes
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_DB = ROOT / "data" / "local-supabase.sqlite3"
+DEFAULT_PORT = 54321
+DINING_HALLS = ROOT / "data" / "dining_halls.csv"
+DINING_GROUPS = ROOT / "data" / "dining_groups.csv"
+NOW = "(strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))"
+
+# Tables the SPA reads and writes, as (column, SQLite declaration) pairs.
+# Columns declared JSON are stored as text and decoded on the way out.
+TABLES = {
+    "reservations_individuals": [
+        ("id", "INTEGER PRIMARY KEY"),
+        ("ref_no", "TEXT UNIQUE"),
+        ("its_no", "TEXT"),
+        ("full_name", "TEXT"),
+        ("group_name", "TEXT"),
+        ("whatsapp", "TEXT"),
+        ("email", "TEXT"),
+        ("arrival_date", "TEXT"),
+        ("arrival_time", "TEXT"),
+        ("departure_date", "TEXT"),
+        ("departure_time", "TEXT"),
+        ("adults", "INTEGER DEFAULT 0"),
+        ("children", "INTEGER DEFAULT 0"),
+        ("infants", "INTEGER DEFAULT 0"),
+        ("total_pax", "INTEGER DEFAULT 0"),
+        ("package_code", "TEXT"),
+        ("notes", "TEXT"),
+        ("source", "TEXT"),
+        ("status", "TEXT DEFAULT 'pending'"),
+        ("created_at", f"TEXT NOT NULL DEFAULT {NOW}"),
+    ],
+    "mawaid_recipes": [
+        ("id", "INTEGER PRIMARY KEY"),
+        ("dish_name", "TEXT NOT NULL"),
+        ("ingredients", "JSON"),
+        ("created_at", f"TEXT DEFAULT {NOW}"),
+    ],
+    "slips": [
+        ("id", "INTEGER PRIMARY KEY"),
+        ("building", "TEXT"),
+        ("checkin_date", "TEXT"),
+        ("checkin_time", "TEXT"),
+        ("checkout_date", "TEXT"),
+        ("checkout_time", "TEXT"),
+        ("gents", "INTEGER DEFAULT 0"),
+        ("ladies", "INTEGER DEFAULT 0"),
+        ("children", "INTEGER DEFAULT 0"),
+        ("infants", "INTEGER DEFAULT 0"),
+        ("total", "INTEGER DEFAULT 0"),
+    ],
+}
+
+# Indexes matching the SPA's queries: the reservation queues filter on
+# status and sort by newest, recipes list by name, slips by building/date.
+# The status index is ascending so a backward scan yields created_at DESC,
+# id DESC (the rowid rides along in every index), which is the keyset order
+# datatables_api pages through.
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS reservations_status_created ON reservations_individuals (status, created_at)",
+    "CREATE INDEX IF NOT EXISTS reservations_created ON reservations_individuals (created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS reservations_its ON reservations_individuals (its_no)",
+    "CREATE INDEX IF NOT EXISTS recipes_dish_name ON mawaid_recipes (dish_name)",
+    "CREATE INDEX IF NOT EXISTS slips_building_checkin ON slips (building, checkin_date)",
+]
+
+OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "LIKE", "ilike": "LIKE"}
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+SINGLE_OBJECT = "application/vnd.pgrst.object+json"
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, code: str, message: str, hint: str | None = None):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "details": None, "hint": hint}
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    # WAL lets the benchmark's readers run while a writer inserts; NORMAL sync
+    # is durable across application crashes, which is enough for a stand-in.
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    connection.execute("PRAGMA cache_size=-65536")
+    return connection
+
+
+def create_schema(connection: sqlite3.Connection) -> None:
+    for table, columns in TABLES.items():
+        body = ", ".join(f'"{name}" {decl}' for name, decl in columns)
+        connection.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({body})')
+    for statement in INDEXES:
+        connection.execute(statement)
+
+
+def seed_reservations(connection: sqlite3.Connection, count: int, batch: int = 50_000) -> None:
+    rng = random.Random(count)
+    statuses = ("pending", "awaiting_payment", "approved", "rejected", "cancelled")
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    columns = ("ref_no", "its_no", "full_name", "arrival_date", "departure_date",
+               "adults", "children", "infants", "total_pax", "source", "status", "created_at")
+    sql = f'INSERT INTO reservations_individuals ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})'
+    offset = connection.execute("SELECT COUNT(*) FROM reservations_individuals").fetchone()[0]
+    for first in range(0, count, batch):
+        rows = []
+        for idx in range(offset + first, offset + min(first + batch, count)):
+            arrive = date(2025, 1, 1) + timedelta(days=rng.randrange(540))
+            adults, children, infants = rng.randrange(1, 6), rng.randrange(0, 4), rng.randrange(0, 2)
+            rows.append((
+                f"UMS-I-{idx:08d}", f"{30000000 + idx}", f"Guest {idx}", arrive.isoformat(),
+                (arrive + timedelta(days=rng.randrange(2, 15))).isoformat(),
+                adults, children, infants, adults + children + infants, "individual",
+                rng.choice(statuses), (start + timedelta(seconds=idx * 37)).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            ))
+        connection.execute("BEGIN")
+        connection.executemany(sql, rows)
+        connection.execute("COMMIT")
+    connection.execute("ANALYZE")
+
+
+def _split_list(value: str) -> list[str]:
+    # PostgREST list syntax: (a,b,"c,d")
+    return [item.strip('"') for item in re.findall(r'"[^"]*"|[^,]+', value.strip("()"))]
+
+
+class Query:
+    def __init__(self, table: str, params: list[tuple[str, str]]):
+        if table not in TABLES:
+            raise ApiError(404, "42P01", f'relation "public.{table}" does not exist')
+        self.table = table
+        self.columns = [name for name, _ in TABLES[table]]
+        self.json_columns = {name for name, decl in TABLES[table] if decl == "JSON"}
+        self.params = params
+        self.where: list[str] = []
+        self.args: list = []
+        for key, value in params:
+            if key not in RESERVED_PARAMS:
+                self._filter(key, value)
+
+    def column(self, name: str) -> str:
+        name = name.strip()
+        if name not in self.columns:
+            raise ApiError(400, "42703", f"column {self.table}.{name} does not exist")
+        return f'"{name}"'
+
+    def _filter(self, key: str, value: str) -> None:
+        column = self.column(key)
+        negate = value.startswith("not.")
+        if negate:
+            value = value[4:]
+        op, _, operand = value.partition(".")
+        if op == "in":
+            items = _split_list(operand)
+            clause = f"{column} IN ({', '.join('?' * len(items))})" if items else "0"
+            self.args.extend(items)
+        elif op == "is":
+            clause = f"{column} IS {'NULL' if operand == 'null' else operand.upper()}"
+            if operand not in ("null", "true", "false"):
+                raise ApiError(400, "PGRST100", f'"is" only accepts null, true or false, not "{operand}"')
+        elif op in OPERATORS:
+            if op in ("like", "ilike"):
+                operand = operand.replace("*", "%")
+            clause = f"{column} {OPERATORS[op]} ?"
+            if op == "ilike":
+                clause = f"lower({column}) LIKE lower(?)"
+            self.args.append(operand)
+        else:
+            raise ApiError(400, "PGRST100", f'unsupported operator "{op}"')
+        self.where.append(f"NOT ({clause})" if negate else clause)
+
+    def where_sql(self) -> str:
+        return f" WHERE {' AND '.join(self.where)}" if self.where else ""
+
+    def select_sql(self) -> str:
+        return ", ".join(self.column(name) for name in self.select_columns())
+
+    def select_columns(self) -> list[str]:
+        select = self.param("select", "*")
+        if select.strip() == "*":
+            return self.columns
+        names = [name.strip() for name in select.split(",") if name.strip()]
+        for name in names:
+            if "(" in name or ":" in name:
+                raise ApiError(400, "PGRST100", "embedded resources and aliases are not supported", select)
+        return names
+
+    def order_sql(self) -> str:
+        order = self.param("order")
+        if not order:
+            return ""
+        terms = []
+        for term in order.split(","):
+            name, *mods = term.split(".")
+            direction = "DESC" if "desc" in mods else "ASC"
+            nulls = " NULLS FIRST" if "nullsfirst" in mods else " NULLS LAST" if "nullslast" in mods else ""
+            terms.append(f"{self.column(name)} {direction}{nulls}")
+        return f" ORDER BY {', '.join(terms)}"
+
+    def limit_sql(self, limit: str | None, offset: str | None) -> tuple[str, list[int]]:
+        if limit is None and offset is None:
+            return "", []
+        return " LIMIT ? OFFSET ?", [int(limit) if limit is not None else -1, int(offset or 0)]
+
+    def param(self, name: str, default: str | None = None) -> str | None:
+        for key, value in self.params:
+            if key == name:
+                return value
+        return default
+
+    def decode(self, row: sqlite3.Row) -> dict:
+        item = dict(row)
+        for name in self.json_columns & item.keys():
+            if item[name] is not None:
+                item[name] = json.loads(item[name])
+        return item
+
+    def encode(self, payload: dict) -> dict:
+        if not isinstance(payload, dict):
+            raise ApiError(400, "PGRST102", "Expected a JSON object (or, for inserts, an array of objects)")
+        unknown = [name for name in payload if name not in self.columns]
+        if unknown:
+            raise ApiError(400, "PGRST204", f"Could not find the '{unknown[0]}' column of '{self.table}' in the schema cache")
+        return {
+            name: json.dumps(value) if name in self.json_columns and value is not None else value
+            for name, value in payload.items()
+        }
+
+
+class RestHandler(BaseHTTPRequestHandler):
+    # PostgREST-shaped responses for GET/POST/PATCH/DELETE on /rest/v1/<table>,
+    # plus DataTables server-side endpoints on /datatables/<view>, batched
+    # card values on /kpis/v1/<page>, report cubes on /reports/v1/<page>,
+    # streamed CSV/XLSX downloads on /export/v1/<table>.<csv|xlsx> and the
+    # dining hall queue on /dining/v1/queue.
+    connection_path: Path
+    kpis: kpi_rollups.KpiService | None = None
+    cubes: report_cubes.ReportCubes | None = None
+    dining: dining_slots.LiveQueue | None = None
+    _local = threading.local()
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect(self.connection_path)
+        return connection
+
+    def log_message(self, format, *args):
+        pass
+
+    def _cors(self) -> None:
+        self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+        self.send_header("Access-Control-Allow-Credentials", "true")
+        self.send_header("Access-Control-Expose-Headers", "Content-Range")
+
+    def _send(self, status: int, body=None, headers: dict | None = None) -> None:
+        data = b"" if body is None else json.dumps(body, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self._cors()
+        if body is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._cors()
+        self.send_header("Access-Control-Allow-Methods", "GET, POST, PATCH, DELETE, OPTIONS")
+        self.send_header("Access-Control-Allow-Headers", self.headers.get("Access-Control-Request-Headers") or "*")
+        self.send_header("Access-Control-Max-Age", "86400")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _query(self) -> Query:
+        parts = urlsplit(self.path)
+        match = re.fullmatch(r"/rest/v1/([\w-]+)", parts.path)
+        if not match:
+            raise ApiError(404, "PGRST125", f"Invalid path specified in request URL: {parts.path}")
+        return Query(unquote(match.group(1)), parse_qsl(parts.query, keep_blank_values=True))
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _prefers(self, value: str) -> bool:
+        return value in (self.headers.get("Prefer") or "")
+
+    def _respond_rows(self, rows: list[dict], status: int = 200, headers: dict | None = None) -> None:
+        if SINGLE_OBJECT in (self.headers.get("Accept") or ""):
+            if len(rows) != 1:
+                raise ApiError(406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                               f"The result contains {len(rows)} rows")
+            self._send(status, rows[0], headers)
+        else:
+            self._send(status, rows, headers)
+
+    def _handle(self, method):
+        try:
+            method()
+        except ApiError as exc:
+            self._send(exc.status, exc.body)
+        except (sqlite3.Error, ValueError) as exc:
+            self._send(400, {"code": "PGRST000", "message": str(exc), "details": None, "hint": None})
+
+    def _dining(self, seat: bool = False) -> None:
+        # GET returns the queue; POST .../seat with {"sh_no", "hall"?} marks a
+        # group seated and returns the re-slotted queue.
+        if self.dining is None:
+            raise ApiError(404, "PGRST125", "The dining queue is not enabled")
+        if not seat:
+            self._send(200, self.dining.snapshot())
+            return
+        payload = self._body()
+        if not isinstance(payload, dict) or not payload.get("sh_no"):
+            raise ApiError(400, "PGRST102", "Expected a JSON object with sh_no")
+        self._send(200, self.dining.seat(str(payload["sh_no"]), payload.get("hall")))
+
+    def _datatables(self, view: str, params: dict) -> None:
+        self._send(200, datatables_api.respond(self.db, view, params))
+
+    def _kpi_page(self, page: str) -> None:
+        if self.kpis is None:
+            raise ApiError(404, "PGRST125", "KPI rollups are not enabled")
+        self._send(200, {"page": page, "kpis": self.kpis.page(page)})
+
+    def _report(self, page: str, params: dict) -> None:
+        if self.cubes is None or page not in self.cubes.cubes:
+            raise ApiError(404, "PGRST125", f"No report cube for {page}")
+        self._send(200, {"page": page, **self.cubes.query(page, params)})
+
+    def _export(self, table: str, fmt: str, params: list[tuple[str, str]]) -> None:
+        # Same select/filter/order/limit/offset syntax as /rest/v1, plus
+        # `headers` (column titles, comma-separated) and `filename`. The query
+        # runs before any header is sent so a bad request still gets a JSON
+        # error.
+        extra = {key: value for key, value in params if key in ("headers", "filename")}
+        query = Query(table, [(key, value) for key, value in params if key not in extra])
+        columns = query.select_columns()
+        headers = [item.strip() for item in extra.get("headers", "").split(",") if item.strip()] or columns
+        if len(headers) != len(columns):
+            raise ApiError(400, "PGRST100", f"{len(headers)} headers given for {len(columns)} columns")
+        paging, paging_args = query.limit_sql(query.param("limit"), query.param("offset"))
+        cursor = self.db.execute(
+            f'SELECT {query.select_sql()} FROM "{query.table}"{query.where_sql()}{query.order_sql()}{paging}',
+            query.args + paging_args,
+        )
+        rows = export_service.iter_rows(cursor)
+        filename = re.sub(r"[^\w.-]", "_", extra.get("filename") or table)
+        self.send_response(200)
+        self._cors()
+        self.send_header("Content-Type", export_service.FORMATS[fmt])
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}.{fmt}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            if fmt == "csv":
+                for chunk in export_service.csv_chunks(headers, rows):
+                    export_service.write_chunk(self.wfile, chunk)
+            else:
+                with export_service.ChunkedWriter(self.wfile) as out:
+                    export_service.write_xlsx(out, headers, rows, sheet=filename)
+            export_service.end_chunks(self.wfile)
+        except (sqlite3.Error, OSError):
+            # Too late for an error response; dropping the connection makes
+            # the download fail instead of looking complete.
+            self.close_connection = True
+        finally:
+            cursor.close()
+
+    # Write hooks: _before_write runs inside the transaction before the change,
+    # _after_write after it, and _written once it has committed.
+    def _before_write(self, table: str, rowids: list[int]) -> dict:
+        return {
+            "kpis": self.kpis.contributions(self.db, table, rowids) if self.kpis else {},
+            "cubes": self.cubes.contributions(self.db, table, rowids) if self.cubes else {},
+        }
+
+    def _after_write(self, table: str, rowids: list[int], before: dict | None = None) -> dict:
+        before = before or {"kpis": {}, "cubes": {}}
+        return {
+            "kpis": self.kpis.apply_write(self.db, table, rowids, before["kpis"]) if self.kpis else {},
+            "cubes_before": before["cubes"],
+            "cubes": self.cubes.contributions(self.db, table, rowids) if self.cubes else {},
+        }
+
+    def _written(self, table: str, updates: dict) -> None:
+        datatables_api.invalidate(table)
+        if self.kpis:
+            self.kpis.publish(updates["kpis"])
+        if self.cubes:
+            self.cubes.apply(updates["cubes_before"], updates["cubes"])
+
+    def _datatables_view(self) -> str | None:
+        match = re.fullmatch(r"/datatables/([\w-]+)", urlsplit(self.path).path)
+        return match.group(1) if match else None
+
+    def do_GET(self):
+        view = self._datatables_view()
+        page = re.fullmatch(r"/kpis/v1/([\w-]+)", urlsplit(self.path).path)
+        report = re.fullmatch(r"/reports/v1/([\w-]+)", urlsplit(self.path).path)
+        export = re.fullmatch(r"/export/v1/(\w+)\.(csv|xlsx)", urlsplit(self.path).path)
+        if view:
+            self._handle(lambda: self._datatables(view, dict(parse_qsl(urlsplit(self.path).query))))
+        elif page:
+            self._handle(lambda: self._kpi_page(page.group(1)))
+        elif report:
+            self._handle(lambda: self._report(report.group(1), dict(parse_qsl(urlsplit(self.path).query))))
+        elif export:
+            self._handle(lambda: self._export(
+                export.group(1), export.group(2), parse_qsl(urlsplit(self.path).query, keep_blank_values=True)))
+        elif urlsplit(self.path).path == "/dining/v1/queue":
+            self._handle(self._dining)
+        else:
+            self._handle(self._get)
+
+    def do_POST(self):
+        view = self._datatables_view()
+        if view:
+            # DataTables posts the same parameters form-encoded when ajax.type is POST.
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length).decode("utf-8")
+            self._handle(lambda: self._datatables(view, dict(parse_qsl(body))))
+        elif urlsplit(self.path).path == "/dining/v1/queue/seat":
+            self._handle(lambda: self._dining(seat=True))
+        else:
+            self._handle(self._post)
+
+    def do_PATCH(self):
+        self._handle(self._patch)
+
+    def do_DELETE(self):
+        self._handle(self._delete)
+
+    def _get(self):
+        query = self._query()
+        limit, offset = query.param("limit"), query.param("offset")
+        range_header = re.fullmatch(r"(\d+)-(\d*)", self.headers.get("Range") or "")
+        if range_header and limit is None:
+            offset = range_header.group(1)
+            if range_header.group(2):
+                limit = str(int(range_header.group(2)) - int(offset) + 1)
+        paging, paging_args = query.limit_sql(limit, offset)
+        sql = f'SELECT {query.select_sql()} FROM "{query.table}"{query.where_sql()}{query.order_sql()}{paging}'
+        rows = [query.decode(row) for row in self.db.execute(sql, query.args + paging_args)]
+        first = int(offset or 0)
+        total = "*"
+        if self._prefers("count=exact"):
+            total = str(self.db.execute(f'SELECT COUNT(*) FROM "{query.table}"{query.where_sql()}', query.args).fetchone()[0])
+        span = f"{first}-{first + len(rows) - 1}" if rows else "*"
+        self._respond_rows(rows, headers={"Content-Range": f"{span}/{total}"})
+
+    def _returning(self, query: Query, rowids: list[int]) -> list[dict]:
+        if not rowids:
+            return []
+        placeholders = ", ".join("?" * len(rowids))
+        sql = f'SELECT {query.select_sql()} FROM "{query.table}" WHERE rowid IN ({placeholders}){query.order_sql()}'
+        return [query.decode(row) for row in self.db.execute(sql, rowids)]
+
+    def _post(self):
+        query = self._query()
+        payload = self._body()
+        rows = payload if isinstance(payload, list) else [payload]
+        rowids = []
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for row in rows:
+                values = query.encode(row)
+                names = ", ".join(query.column(name) for name in values)
+                cursor = db.execute(
+                    f'INSERT INTO "{query.table}" ({names}) VALUES ({", ".join("?" * len(values))})'
+                    if values else f'INSERT INTO "{query.table}" DEFAULT VALUES',
+                    list(values.values()),
+                )
+                rowids.append(cursor.lastrowid)
+            updates = self._after_write(query.table, rowids)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self._written(query.table, updates)
+        if self._prefers("return=representation"):
+            self._respond_rows(self._returning(query, rowids), status=201)
+        else:
+            self._send(201)
+
+    def _patch(self):
+        query = self._query()
+        values = query.encode(self._body() or {})
+        if not values:
+            raise ApiError(400, "PGRST100", "Empty update payload")
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            rowids = [row[0] for row in db.execute(f'SELECT rowid FROM "{query.table}"{query.where_sql()}', query.args)]
+            before = self._before_write(query.table, rowids)
+            if rowids:
+                assignments = ", ".join(f"{query.column(name)} = ?" for name in values)
+                db.execute(
+                    f'UPDATE "{query.table}" SET {assignments} WHERE rowid IN ({", ".join("?" * len(rowids))})',
+                    list(values.values()) + rowids,
+                )
+            updates = self._after_write(query.table, rowids, before)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self._written(query.table, updates)
+        if self._prefers("return=representation"):
+            self._respond_rows(self._returning(query, rowids))
+        else:
+            self._send(204)
+
+    def _delete(self):
+        query = self._query()
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            returned = []
+            if self._prefers("return=representation"):
+                returned = [query.decode(row) for row in db.execute(
+                    f'SELECT {query.select_sql()} FROM "{query.table}"{query.where_sql()}', query.args)]
+            rowids = [row[0] for row in db.execute(f'SELECT rowid FROM "{query.table}"{query.where_sql()}', query.args)]
+            before = self._before_write(query.table, rowids)
+            db.execute(f'DELETE FROM "{query.table}"{query.where_sql()}', query.args)
+            updates = self._after_write(query.table, rowids, before)
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        self._written(query.table, updates)
+        if self._prefers("return=representation"):
+            self._respond_rows(returned)
+        else:
+            self._send(204)
+
+
+def serve(db_path: Path, port: int) -> None:
+    kpis = kpi_rollups.KpiService()
+    kpis.start(connect(db_path))
+    threading.Thread(target=kpi_rollups.refresh_loop, args=(kpis, connect(db_path)), daemon=True).start()
+    cubes = report_cubes.ReportCubes()
+    cubes.start(connect(db_path))
+    dining = None
+    if DINING_HALLS.exists() and DINING_GROUPS.exists():
+        dining = dining_slots.LiveQueue(dining_slots.plan_from_csv(DINING_HALLS, DINING_GROUPS, datetime.now()))
+    handler = type("Handler", (RestHandler,), {
+        "connection_path": db_path, "_local": threading.local(), "kpis": kpis, "cubes": cubes, "dining": dining,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    print(f"PostgREST stand-in on http://127.0.0.1:{port} (database {db_path})")
+    print(f'Point the SPA at it with localStorage.setItem("ums-supabase-url", "http://127.0.0.1:{port}")')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the SPA's Supabase tables from a local SQLite database.")
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help="SQLite database file")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (default 54321)")
+    parser.add_argument("--seed-reservations", type=int, default=0, metavar="N",
+                        help="append N synthetic reservations before serving")
+    parser.add_argument("--no-serve", action="store_true", help="create/seed the database and exit")
+    args = parser.parse_args(argv)
+
+    args.db.parent.mkdir(parents=True, exist_ok=True)
+    connection = connect(args.db)
+    create_schema(connection)
+    if args.seed_reservations:
+        seed_reservations(connection, args.seed_reservations)
+        print(f"Seeded {args.seed_reservations:,} reservations")
+    connection.close()
+    if not args.no_serve:
+        serve(args.db, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+from __future__ import annotations
+import bisect
+import csv
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Longest a group should wait at the pickup point for its bus.
+MAX_WAIT = timedelta(minutes=90)
+
+
+@dataclass(frozen=True)
+class Group:
+    group_id: str
+    name: str
+    pax: int
+    pickup: str
+    flight: str
+    ready_at: datetime
+    delay: timedelta = timedelta(0)
+
+    @property
+    def available_at(self) -> datetime:
+        return self.ready_at + self.delay
+
+
+@dataclass(frozen=True)
+class TripSlot:
+    trip_id: str
+    route: str
+    pickup: str
+    departs: datetime
+    capacity: int
+    vehicle: str = ""
+    driver: str = ""
+
+
+@dataclass(frozen=True)
+class Unassigned:
+    group_id: str
+    name: str
+    pax: int
+    reason: str
+
+
+@dataclass
+class Plan:
+    trips: dict[str, TripSlot]
+    groups: dict[str, Group] = field(default_factory=dict)
+    loads: dict[str, list[str]] = field(default_factory=dict)
+    placed: dict[str, str] = field(default_factory=dict)
+    unassigned: list[Unassigned] = field(default_factory=list)
+    max_wait: timedelta = MAX_WAIT
+
+    def __post_init__(self):
+        # Departure times and trip ids per pickup point, sorted by departure,
+        # for window lookups.
+        by_pickup: dict[str, list[tuple[datetime, str]]] = {}
+        for trip in self.trips.values():
+            by_pickup.setdefault(trip.pickup, []).append((trip.departs, trip.trip_id))
+            self.loads.setdefault(trip.trip_id, [])
+        for items in by_pickup.values():
+            items.sort()
+        self._departures = {pickup: [when for when, _ in items] for pickup, items in by_pickup.items()}
+        self._trip_ids = {pickup: [trip_id for _, trip_id in items] for pickup, items in by_pickup.items()}
+        self._booked = dict.fromkeys(self.trips, 0)
+
+    def booked(self, trip_id: str) -> int:
+        return self._booked[trip_id]
+
+    def _candidates(self, group: Group) -> list[TripSlot]:
+        departures = self._departures.get(group.pickup, [])
+        lo = bisect.bisect_left(departures, group.available_at)
+        hi = bisect.bisect_right(departures, group.available_at + self.max_wait)
+        return [self.trips[trip_id] for trip_id in self._trip_ids.get(group.pickup, [])[lo:hi]]
+
+    def _place(self, group: Group) -> bool:
+        # Best fit: the bus left with the fewest empty seats, earliest first,
+        # so large gaps stay open for the large groups still to come.
+        best = None
+        for trip in self._candidates(group):
+            spare = trip.capacity - self._booked[trip.trip_id] - group.pax
+            if spare >= 0 and (best is None or (spare, trip.departs) < best[0]):
+                best = ((spare, trip.departs), trip.trip_id)
+        if best is None:
+            return False
+        trip_id = best[1]
+        self.loads[trip_id].append(group.group_id)
+        self._booked[trip_id] += group.pax
+        self.placed[group.group_id] = trip_id
+        return True
+
+    def _remove(self, group_id: str) -> None:
+        trip_id = self.placed.pop(group_id, None)
+        if trip_id is not None:
+            self.loads[trip_id].remove(group_id)
+            self._booked[trip_id] -= self.groups[group_id].pax
+        self.unassigned = [item for item in self.unassigned if item.group_id != group_id]
+
+    def _unassigned(self, group: Group) -> Unassigned:
+        largest = max((trip.capacity for trip in self.trips.values() if trip.pickup == group.pickup), default=0)
+        if not largest:
+            reason = f"No trips from {group.pickup}"
+        elif group.pax > largest:
+            reason = "Group larger than any bus at pickup"
+        elif not self._candidates(group):
+            reason = f"No trip within {int(self.max_wait.total_seconds() // 60)} min of arrival"
+        else:
+            reason = "No bus with enough free seats"
+        return Unassigned(group.group_id, group.name, group.pax, reason)
+
+    def assign(self, groups) -> None:
+        # Whole manifest in one batch, best-fit decreasing: largest groups
+        # first, each into its best-fitting bus; groups are never split across
+        # trips.
+        groups = list(groups)
+        for group in groups:
+            self.groups[group.group_id] = group
+        for group in sorted(groups, key=lambda group: (-group.pax, group.available_at, group.group_id)):
+            if not self._place(group):
+                self.unassigned.append(self._unassigned(group))
+
+    def delay_flight(self, flight: str, delay: timedelta) -> list[str]:
+        # Re-optimise after a delayed flight: only that flight's groups are
+        # lifted and re-packed, so other manifests stay as published. Returns
+        # the groups whose trip changed. Groups with no flight recorded are
+        # never matched.
+        if not flight:
+            return []
+        moved = [group for group in self.groups.values() if group.flight == flight]
+        before = {group.group_id: self.placed.get(group.group_id) for group in moved}
+        for group in moved:
+            self._remove(group.group_id)
+        self.assign(replace(group, delay=delay) for group in moved)
+        return [group_id for group_id, trip_id in before.items() if self.placed.get(group_id) != trip_id]
+
+    def manifests(self) -> dict[str, list[Group]]:
+        return {trip_id: [self.groups[group_id] for group_id in loads] for trip_id, loads in self.loads.items()}
+
+
+def plan_day(trips, groups, max_wait: timedelta = MAX_WAIT) -> Plan:
+    plan = Plan({trip.trip_id: trip for trip in trips}, max_wait=max_wait)
+    plan.assign(groups)
+    return plan
+
+
+def trip_rows(plan: Plan, now: datetime | None = None) -> list[list[str]]:
+    # Rows for the journey pages' "Trip list" table.
+    now = now or datetime.now()
+    rows = []
+    for trip in sorted(plan.trips.values(), key=lambda trip: (trip.departs, trip.trip_id)):
+        booked = plan.booked(trip.trip_id)
+        if trip.departs <= now:
+            status = "Completed"
+        elif any(plan.groups[group_id].delay for group_id in plan.loads[trip.trip_id]):
+            status = "Delayed"
+        else:
+            status = "Full" if booked >= trip.capacity else "Open"
+        rows.append([
+            trip.trip_id,
+            f"{trip.departs:%Y-%m-%d %H:%M}",
+            trip.route,
+            trip.vehicle,
+            trip.driver,
+            f"{booked} / {trip.capacity}",
+            status,
+            "Manifest",
+        ])
+    return rows
+
+
+def manifest_rows(plan: Plan) -> list[list[str]]:
+    return [
+        [trip_id, group.group_id, group.name, str(group.pax), group.flight, f"{group.available_at:%H:%M}"]
+        for trip_id, groups in plan.manifests().items()
+        for group in groups
+    ]
+
+
+def journey_kpis(plan: Plan, now: datetime | None = None) -> dict[str, int]:
+    # Card values for the transport-journeys-*.html pages.
+    now = now or datetime.now()
+    completed = [trip for trip in plan.trips.values() if trip.departs <= now]
+    return {
+        "Trips scheduled": len(plan.trips),
+        "Completed": len(completed),
+        "Pax moved": sum(plan.booked(trip.trip_id) for trip in completed),
+        "Delayed": sum(
+            1 for trip_id, loads in plan.loads.items()
+            if plan.trips[trip_id].departs > now and any(plan.groups[group_id].delay for group_id in loads)
+        ),
+    }
+
+
+def load_trips_csv(path: Path, journey: str | None = None) -> list[TripSlot]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            TripSlot(
+                trip_id=row["trip_id"],
+                route=row["route"],
+                pickup=row["pickup"],
+                departs=datetime.fromisoformat(row["departs"]),
+                capacity=int(row["capacity"]),
+                vehicle=row.get("vehicle") or "",
+                driver=row.get("driver") or "",
+            )
+            for row in csv.DictReader(handle)
+            if journey is None or row.get("journey") == journey
+        ]
+
+
+def load_groups_csv(path: Path, journey: str | None = None) -> list[Group]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Group(
+                group_id=row["group_id"],
+                name=row["name"],
+                pax=int(row["pax"]),
+                pickup=row["pickup"],
+                flight=row.get("flight") or "",
+                ready_at=datetime.fromisoformat(row["ready_at"]),
+                delay=timedelta(minutes=int(row.get("delay_minutes") or 0)),
+            )
+            for row in csv.DictReader(handle)
+            if journey is None or row.get("journey") == journey
+        ]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import calendar
+import csv
+from dataclasses import dataclass
+from datetime import date
+from decimal import ROUND_HALF_UP, Context, Decimal, localcontext
+from pathlib import Path
+
+CENTS = Decimal("0.01")
+# Fixed context so results never depend on the caller's decimal settings.
+PAY_CONTEXT = Context(prec=28, rounding=ROUND_HALF_UP)
+# Daily rate is basic / 30 whatever the month's length; the hourly rate
+# assumes an 8-hour day, and overtime pays that rate plus half the basic.
+PAY_DAYS = Decimal(30)
+DAY_HOURS = Decimal(8)
+OVERTIME_FACTOR = Decimal("1.5")
+UNPAID_KINDS = ("Unpaid",)
+
+
+@dataclass(frozen=True)
+class PayProfile:
+    code: str
+    name: str
+    role: str
+    department: str
+    basic: Decimal
+    allowances: Decimal = Decimal(0)
+    deductions: Decimal = Decimal(0)
+    status: str = "Pending"
+    paid_on: date | None = None
+
+
+@dataclass(frozen=True)
+class PayLine:
+    profile: PayProfile
+    allowances: Decimal
+    deductions: Decimal
+    net: Decimal
+    unpaid_days: int
+    overtime_hours: Decimal
+
+
+def unpaid_days(leave, year: int, month: int) -> dict[str, int]:
+    # Approved unpaid leave days falling inside the pay month, per employee.
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    days: dict[str, int] = {}
+    for item in leave:
+        if item.status != "Approved" or item.kind not in UNPAID_KINDS:
+            continue
+        start, end = max(item.start, first), min(item.end, last)
+        if start <= end:
+            days[item.employee] = days.get(item.employee, 0) + (end - start).days + 1
+    return days
+
+
+def overtime_from_schedules(schedules) -> dict[str, Decimal]:
+    # Overtime hours per employee summed over the month's weekly rotas.
+    hours: dict[str, Decimal] = {}
+    for schedule in schedules:
+        for code, extra in schedule.overtime().items():
+            hours[code] = hours.get(code, Decimal(0)) + Decimal(extra)
+    return hours
+
+
+def _line(profile: PayProfile, unpaid: int, overtime: Decimal) -> PayLine:
+    daily = profile.basic / PAY_DAYS
+    overtime_pay = daily / DAY_HOURS * OVERTIME_FACTOR * overtime
+    allowances = (profile.allowances + overtime_pay).quantize(CENTS, ROUND_HALF_UP)
+    deductions = (profile.deductions + daily * min(unpaid, int(PAY_DAYS))).quantize(CENTS, ROUND_HALF_UP)
+    net = max(profile.basic + allowances - deductions, Decimal(0))
+    return PayLine(profile, allowances, deductions, net, unpaid, overtime)
+
+
+class PayrollBatch:
+    # One pass over the whole roster under a single decimal context, plus
+    # running totals so a single employee can be re-run (after a leave or
+    # attendance correction) by swapping in their new line.
+    def __init__(self, profiles, unpaid: dict[str, int] | None = None, overtime: dict[str, Decimal] | None = None):
+        unpaid = unpaid or {}
+        overtime = overtime or {}
+        with localcontext(PAY_CONTEXT):
+            self.lines = {
+                profile.code: _line(profile, unpaid.get(profile.code, 0), Decimal(overtime.get(profile.code, 0)))
+                for profile in profiles
+            }
+        self.total = sum((line.net for line in self.lines.values()), Decimal(0))
+        self.paid = sum((line.net for line in self.lines.values() if line.profile.status == "Paid"), Decimal(0))
+
+    def rerun(self, code: str, profile: PayProfile | None = None, unpaid: int | None = None,
+              overtime: Decimal | None = None) -> PayLine:
+        old = self.lines[code]
+        with localcontext(PAY_CONTEXT):
+            line = _line(
+                profile or old.profile,
+                old.unpaid_days if unpaid is None else unpaid,
+                old.overtime_hours if overtime is None else Decimal(overtime),
+            )
+        self.lines[code] = line
+        self.total += line.net - old.net
+        if old.profile.status == "Paid":
+            self.paid -= old.net
+        if line.profile.status == "Paid":
+            self.paid += line.net
+        return line
+
+    def rows(self) -> list[list[str]]:
+        # Rows for accounts-salaries.html's "Payroll list" table.
+        with localcontext(PAY_CONTEXT):
+            return [
+                [
+                    line.profile.name,
+                    line.profile.role,
+                    line.profile.department,
+                    f"{line.profile.basic:,.2f}",
+                    f"{line.allowances:,.2f}",
+                    f"{line.deductions:,.2f}",
+                    f"{line.net:,.2f}",
+                    line.profile.status,
+                    f"{line.profile.paid_on:%Y-%m-%d}" if line.profile.paid_on else "",
+                    "Adjust",
+                ]
+                for line in sorted(self.lines.values(), key=lambda line: (line.profile.department, line.profile.name))
+            ]
+
+    def kpis(self) -> dict[str, Decimal | int]:
+        # Card values for accounts-salaries.html.
+        with localcontext(PAY_CONTEXT):
+            return {
+                "Total payroll": self.total,
+                "Paid %": (self.paid / self.total * 100).quantize(Decimal(1)) if self.total else Decimal(0),
+                "Pending amount": self.total - self.paid,
+                "Adjustments": sum(1 for line in self.lines.values() if line.unpaid_days or line.overtime_hours),
+            }
+
+
+def sar(amount: Decimal) -> str:
+    # Compact card format used across the Accounts pages: SAR 2.4M / 780k.
+    with localcontext(PAY_CONTEXT):
+        if amount >= 1_000_000:
+            return f"SAR {amount / 1_000_000:.1f}M"
+        if amount >= 1_000:
+            return f"SAR {amount / 1_000:.0f}k"
+        return f"SAR {amount:,.0f}"
+
+
+def load_profiles_csv(path: Path) -> list[PayProfile]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            PayProfile(
+                code=row["code"],
+                name=row["name"],
+                role=row.get("role") or "",
+                department=row.get("department") or "",
+                basic=Decimal(row["basic"]),
+                allowances=Decimal(row.get("allowances") or 0),
+                deductions=Decimal(row.get("deductions") or 0),
+                status=row.get("status") or "Pending",
+                paid_on=date.fromisoformat(row["paid_on"]) if row.get("paid_on") else None,
+            )
+            for row in csv.DictReader(handle)
+        ]
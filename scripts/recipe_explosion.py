@@ -0,0 +1,158 @@
+from __future__ import annotations
+import csv
+import math
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+from thal_counts import Recipe
+
+# Sparse matrices are dicts of row -> {column: value}; only non-zero cells are
+# stored, so a 30-day plan over a few hundred recipes and items stays small.
+Sparse = dict
+
+
+def matmul(left: Sparse, right: Sparse) -> Sparse:
+    # Row-by-row sparse product: each non-zero left[i][k] scales row k of
+    # `right`, so the work is proportional to the non-zeros actually touched.
+    out: Sparse = {}
+    for row, cells in left.items():
+        acc: dict = {}
+        for key, value in cells.items():
+            for col, weight in right.get(key, {}).items():
+                acc[col] = acc.get(col, 0.0) + value * weight
+        if acc:
+            out[row] = acc
+    return out
+
+
+@dataclass(frozen=True)
+class InventoryItem:
+    item: str
+    category: str
+    unit: str
+    stock: float
+    reorder_level: float
+    supplier: str = ""
+    unit_cost: float = 0.0
+    pack_size: float = 1.0
+
+
+@dataclass(frozen=True)
+class PurchaseLine:
+    item: str
+    unit: str
+    supplier: str
+    demand: float
+    stock: float
+    order_qty: float
+    needed_by: date
+    value: float
+
+
+def expected_pax(presences) -> Counter:
+    # Diners per (day, meal) from group presence, the same meals the thal
+    # pipeline counts.
+    pax: Counter = Counter()
+    for presence in presences:
+        for key in presence.meals():
+            pax[key] += presence.pax
+    return pax
+
+
+def servings_matrix(menu: dict[tuple[date, str], list[str]], pax) -> Sparse:
+    # day x dish: servings needed, summed over the meals the dish is on.
+    servings: Sparse = {}
+    for (day, meal), dishes in menu.items():
+        diners = pax.get((day, meal), 0)
+        if not diners:
+            continue
+        row = servings.setdefault(day, {})
+        for dish in dishes:
+            row[dish] = row.get(dish, 0) + diners
+    return servings
+
+
+def recipe_matrix(recipes: dict[str, Recipe]) -> Sparse:
+    # dish x item: quantity per serving.
+    return {
+        dish: {item: qty / recipe.yield_servings for item, qty in recipe.ingredients.items()}
+        for dish, recipe in recipes.items()
+    }
+
+
+def ingredient_demand(menu, recipes: dict[str, Recipe], pax) -> Sparse:
+    # day x item demand = (day x dish servings) . (dish x item per serving).
+    return matmul(servings_matrix(menu, pax), recipe_matrix(recipes))
+
+
+def purchase_requirements(demand: Sparse, inventory: dict[str, InventoryItem]) -> list[PurchaseLine]:
+    # Walk each item's daily demand against stock: it is needed by the first
+    # day projected stock falls below its reorder level, and the order covers
+    # the whole plan plus the reorder buffer, rounded up to whole packs.
+    totals: dict[str, float] = {}
+    needed_by: dict[str, date] = {}
+    for day in sorted(demand):
+        for item, qty in demand[day].items():
+            totals[item] = totals.get(item, 0.0) + qty
+            info = inventory.get(item)
+            stock = info.stock if info else 0.0
+            reorder = info.reorder_level if info else 0.0
+            if item not in needed_by and stock - totals[item] < reorder:
+                needed_by[item] = day
+    lines = []
+    for item, day in needed_by.items():
+        info = inventory.get(item) or InventoryItem(item, "", "", 0.0, 0.0)
+        short = totals[item] + info.reorder_level - info.stock
+        pack = info.pack_size or 1.0
+        order_qty = math.ceil(round(short / pack, 9)) * pack
+        lines.append(PurchaseLine(
+            item=item,
+            unit=info.unit,
+            supplier=info.supplier or "Unassigned",
+            demand=totals[item],
+            stock=info.stock,
+            order_qty=order_qty,
+            needed_by=day,
+            value=order_qty * info.unit_cost,
+        ))
+    return sorted(lines, key=lambda line: (line.needed_by, line.supplier, line.item))
+
+
+def po_rows(lines: list[PurchaseLine], today: date) -> list[list[str]]:
+    # Draft POs, one per supplier, for mawaid-supply-chain.html's "PO list".
+    by_supplier: dict[str, list[PurchaseLine]] = {}
+    for line in lines:
+        by_supplier.setdefault(line.supplier, []).append(line)
+    rows = []
+    for idx, (supplier, items) in enumerate(sorted(by_supplier.items()), start=1):
+        rows.append([
+            f"DRAFT-{today:%y%m%d}-{idx:03d}",
+            f"{today:%Y-%m-%d}",
+            supplier,
+            str(len(items)),
+            f"SAR {sum(line.value for line in items):,.0f}",
+            "Draft",
+            f"{min(line.needed_by for line in items):%Y-%m-%d}",
+            "Review",
+        ])
+    return rows
+
+
+def load_inventory_csv(path: Path) -> dict[str, InventoryItem]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        items = [
+            InventoryItem(
+                item=row["item"],
+                category=row.get("category") or "",
+                unit=row.get("unit") or "",
+                stock=float(row["stock"]),
+                reorder_level=float(row.get("reorder_level") or 0),
+                supplier=row.get("supplier") or "",
+                unit_cost=float(row.get("unit_cost") or 0),
+                pack_size=float(row.get("pack_size") or 1),
+            )
+            for row in csv.DictReader(handle)
+        ]
+    return {item.item: item for item in items}
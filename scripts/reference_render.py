@@ -0,0 +1,265 @@
+from __future__ import annotations
+import json
+from html import escape
+from textwrap import dedent
+
+# Original dedent-based helpers. generate_partials.py renders through compiled
+# templates; these stay as the reference output for `--check-parity`.
+
+
+def render_badge(text: str, badge: str = "bg-primary") -> str:
+    if not text:
+        return ""
+    return f"<span class=\"badge {badge}\">{text}</span>"
+
+
+def render_filters(filters: list[str]) -> str:
+    if not filters:
+        return ""
+    inputs = []
+    for flt in filters:
+        inputs.append(dedent(f"""
+            <div class=\"col-md-3\">
+              <label class=\"form-label\">{flt}</label>
+              <input type=\"text\" class=\"form-control form-control-sm\" placeholder=\"{flt}\">
+            </div>
+        """))
+    return dedent(f"""
+        <div class=\"card mb-3\">
+          <div class=\"card-body\">
+            <form class=\"row g-3\">
+{''.join(inputs)}
+              <div class=\"col-md-3 d-flex align-items-end\">
+                <div class=\"btn-group\">
+                  <button type=\"button\" class=\"btn btn-primary btn-sm\">Apply</button>
+                  <button type=\"button\" class=\"btn btn-outline-secondary btn-sm\">Reset</button>
+                </div>
+              </div>
+            </form>
+          </div>
+        </div>
+    """)
+
+
+def render_cards(cards: list[dict], rollups: str | None = None) -> str:
+    if not cards:
+        return ""
+    items = []
+    for card in cards:
+        badge = render_badge(card.get("context"), card.get("badge", "bg-primary"))
+        items.append(dedent(f"""
+            <div class=\"col-sm-6 col-lg-3\">
+              <div class=\"card mb-3\">
+                <div class=\"card-body\">
+                  <div class=\"text-muted small\">{card['label']}</div>
+                  <h3 class=\"mb-2\">{card['value']}</h3>
+                  {badge}
+                </div>
+              </div>
+            </div>
+        """))
+    attrs = f' data-kpi-rollups="{rollups}"' if rollups else ""
+    return f"<div class=\"row\"{attrs}>" + "".join(items) + "</div>"
+
+
+def render_buttons(actions: list[str], export: str | None = None) -> str:
+    if not actions:
+        return ""
+    btns = "".join(
+        f"<button type=\"button\" class=\"btn btn-outline-primary btn-sm\">{action}</button>" for action in actions
+    )
+    attrs = f' data-export="{escape(export)}"' if export else ""
+    return dedent(f"""
+        <div class=\"d-flex flex-wrap gap-2 mb-3\"{attrs}>{btns}</div>
+    """)
+
+
+def render_table(table: dict) -> str:
+    if not table:
+        return ""
+    columns = table.get("columns", [])
+    if not columns:
+        return ""
+    server_side = table.get("server_side")
+    attrs = ""
+    sample_rows = []
+    if server_side:
+        attrs = f' data-dt-ajax="{server_side["url"]}" data-dt-columns="{",".join(server_side["columns"])}"'
+    for row in table.get("rows") or [[f"Sample {col}" for col in columns]] * 3:
+        tds = "".join(f"<td>{cell}</td>" for cell in row)
+        sample_rows.append(f"<tr>{tds}</tr>")
+    if table.get("report"):
+        attrs += f' data-report="{table["report"]}"'
+    if table.get("queue"):
+        attrs += f' data-queue="{table["queue"]}"'
+    return dedent(f"""
+        <div class=\"card mb-3\">
+          <div class=\"card-header\">
+            <h5 class=\"card-title mb-0\">{table.get('title', 'Data')}</h5>
+            <div class=\"text-muted small\">{table.get('description', 'Replace with live data')}</div>
+          </div>
+          <div class=\"table-responsive\">
+            <table class=\"table table-striped align-middle\"{attrs}>
+              <thead>
+                <tr>{''.join(f'<th>{col}</th>' for col in columns)}</tr>
+              </thead>
+              <tbody>
+{''.join(sample_rows)}
+              </tbody>
+            </table>
+          </div>
+        </div>
+    """)
+
+
+def render_tabs(tabs: list[dict]) -> str:
+    if not tabs:
+        return ""
+    nav = []
+    content = []
+    for idx, tab in enumerate(tabs):
+        active = "active" if idx == 0 else ""
+        show = "show active" if idx == 0 else ""
+        selected = "true" if idx == 0 else "false"
+        tab_id = f"tab-{tab['name'].lower().replace(' ', '-') }"
+        nav.append(dedent(f"""
+          <li class=\"nav-item\">
+            <button class=\"nav-link {active}\" data-bs-toggle=\"tab\" data-bs-target=\"#{tab_id}\" type=\"button\" role=\"tab\" aria-selected=\"{selected}\">{tab['name']}</button>
+          </li>
+        """))
+        table_html = render_table(tab.get('table', {})) if tab.get('table') else ''
+        content.append(dedent(f"""
+          <div class=\"tab-pane fade {show}\" id=\"{tab_id}\" role=\"tabpanel\">
+            <p class=\"text-muted\">{tab.get('description', 'Tab content goes here.')}</p>
+            {table_html}
+          </div>
+        """))
+    return dedent(f"""
+        <div class=\"card mb-3\">
+          <div class=\"card-header border-bottom-0 pb-0\">
+            <ul class=\"nav nav-tabs card-header-tabs\" role=\"tablist\">
+{''.join(nav)}
+            </ul>
+          </div>
+          <div class=\"card-body\">
+            <div class=\"tab-content\">
+{''.join(content)}
+            </div>
+          </div>
+        </div>
+    """)
+
+
+def render_sidecards(sidecards: list[dict]) -> str:
+    blocks = []
+    for card in sidecards:
+        items = "".join(f"<li>{item}</li>" for item in card.get("items", []))
+        extra = card.get("extra", "")
+        blocks.append(dedent(f"""
+            <div class=\"card mb-3\">
+              <div class=\"card-header\">
+                <h5 class=\"card-title mb-0\">{card['title']}</h5>
+              </div>
+              <div class=\"card-body\">
+                <p class=\"text-muted small\">{card.get('description', '')}</p>
+                <ul class=\"small ps-3 mb-0\">{items}</ul>
+                {extra}
+              </div>
+            </div>
+        """))
+    return "".join(blocks)
+
+
+def render_charts(charts: list[dict]) -> str:
+    cards = []
+    for chart in charts:
+        series = ""
+        if chart.get("series"):
+            series = f" data-series=\"{escape(json.dumps(chart['series'], separators=(',', ':')))}\""
+        cards.append(dedent(f"""
+            <div class=\"card mb-3\">
+              <div class=\"card-header\">
+                <h5 class=\"card-title mb-0\">{chart['title']}</h5>
+                <div class=\"text-muted small\">{chart.get('description', 'Hook chart library later')}</div>
+              </div>
+              <div class=\"card-body\">
+                <div class=\"chart-placeholder\"{series} style=\"height: 220px; background: rgba(0,0,0,.04); border-radius: .5rem;\"></div>
+              </div>
+            </div>
+        """))
+    return "".join(cards)
+
+
+def render_modals(modals: list[dict]) -> str:
+    blocks = []
+    for modal in modals:
+        blocks.append(dedent(f"""
+            <div class=\"modal fade\" tabindex=\"-1\" id=\"modal-{modal['id']}\" aria-hidden=\"true\">
+              <div class=\"modal-dialog modal-lg modal-dialog-centered\">
+                <div class=\"modal-content\">
+                  <div class=\"modal-header\">
+                    <h5 class=\"modal-title\">{modal['title']}</h5>
+                    <button type=\"button\" class=\"btn-close\" data-bs-dismiss=\"modal\" aria-label=\"Close\"></button>
+                  </div>
+                  <div class=\"modal-body\">
+                    <p class=\"text-muted\">{modal.get('description', 'Describe the form fields here.')}</p>
+                  </div>
+                  <div class=\"modal-footer\">
+                    <button type=\"button\" class=\"btn btn-outline-secondary\" data-bs-dismiss=\"modal\">Cancel</button>
+                    <button type=\"button\" class=\"btn btn-primary\">Save</button>
+                  </div>
+                </div>
+              </div>
+            </div>
+        """))
+    return "".join(blocks)
+
+
+def render_page(spec: dict) -> str:
+    header = dedent(f"""
+        <div class=\"row mb-2 mb-xl-3\">
+          <div class=\"col-auto d-none d-sm-block\">
+            <h3 class=\"mb-0\"><strong>{spec['section']}</strong> / {spec['title']}</h3>
+            <div class=\"text-muted\">{spec['goal']}</div>
+          </div>
+        </div>
+    """)
+
+    cards = render_cards(spec.get('kpis', []), spec.get('kpi_rollups'))
+    filters = render_filters(spec.get('filters', []))
+    actions = render_buttons(spec.get('actions', []), spec.get('export'))
+    tabs = render_tabs(spec.get('tabs', []))
+    table = render_table(spec.get('table', {})) if not tabs else ''
+    charts = render_charts(spec.get('charts', []))
+    sidecards = render_sidecards(spec.get('sidecards', []))
+    modals = render_modals(spec.get('modals', []))
+
+    main = "".join([
+        cards,
+        filters,
+        actions,
+        tabs or table,
+        spec.get('extra', ''),
+        charts,
+    ])
+
+    if spec.get('layout', 'split') == 'full':
+        body = dedent(f"""
+            <div class=\"container-fluid p-0\">
+              {header}
+              {main}
+              {modals}
+            </div>
+        """)
+    else:
+        body = dedent(f"""
+            <div class=\"container-fluid p-0\">
+              {header}
+              <div class=\"row\">
+                <div class=\"col-xxl-9\">{main}</div>
+                <div class=\"col-xxl-3\">{sidecards}</div>
+              </div>
+              {modals}
+            </div>
+        """)
+    return "\n".join(line.rstrip() for line in body.splitlines()) + "\n"
@@ -0,0 +1,203 @@
+from __future__ import annotations
+import bisect
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+DAY = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+@dataclass(frozen=True)
+class Measure:
+    name: str
+    # SQL expression summed per fact row.
+    expr: str = "1"
+
+
+@dataclass(frozen=True)
+class Chart:
+    name: str
+    numerator: str
+    denominator: str | None = None
+    scale: float = 1.0
+
+
+@dataclass(frozen=True)
+class Report:
+    page: str
+    table: str
+    # SQL expression giving each fact's day as YYYY-MM-DD.
+    day: str
+    # Filter name (the page's filter label, lower-cased) -> column.
+    dimensions: dict[str, str]
+    measures: tuple[Measure, ...]
+    group_by: str
+    # Builds one "Aggregated table" row from a group value and its totals.
+    row: Callable[[str, dict[str, float]], list[str]]
+    charts: tuple[Chart, Chart]
+
+
+def _ratio(numerator: float, denominator: float, scale: float = 1.0) -> float | None:
+    return round(numerator / denominator * scale, 1) if denominator else None
+
+
+def _reservation_row(source: str, totals: dict[str, float]) -> list[str]:
+    conversion = _ratio(totals["approved"], totals["bookings"], 100)
+    return [source or "(none)", f"{totals['bookings']:,.0f}", f"{conversion}%" if conversion is not None else "—", "—"]
+
+
+# Reports whose facts live in the local database. The reservations table has
+# no amounts yet, so Revenue stays a placeholder.
+REPORTS = {
+    "report-reservations": Report(
+        page="report-reservations",
+        table="reservations_individuals",
+        day="substr(created_at, 1, 10)",
+        dimensions={"source": "source", "status": "status"},
+        measures=(
+            Measure("bookings"),
+            Measure("approved", "status = 'approved'"),
+            Measure("pax", "total_pax"),
+        ),
+        group_by="source",
+        row=_reservation_row,
+        charts=(Chart("bookings", "bookings"), Chart("conversion", "approved", "bookings", 100)),
+    ),
+}
+
+
+@dataclass
+class Cube:
+    # Daily cells keyed by the report's dimension values, each holding the
+    # measure sums for that day and combination. A query only visits the
+    # cells for the days in range, so its cost follows days x combinations
+    # rather than the number of facts.
+    report: Report
+    cells: dict[str, dict[tuple, list[float]]] = field(default_factory=dict)
+    days: list[str] = field(default_factory=list)
+
+    def add(self, day: str, dims: tuple, values, sign: int = 1) -> None:
+        if day not in self.cells:
+            bisect.insort(self.days, day)
+            self.cells[day] = {}
+        cell = self.cells[day].setdefault(dims, [0.0] * len(self.report.measures))
+        for idx, value in enumerate(values):
+            cell[idx] += sign * (value or 0)
+        if not any(cell):
+            del self.cells[day][dims]
+
+    def _select(self) -> str:
+        report = self.report
+        dims = ", ".join(f'"{column}"' for column in report.dimensions.values())
+        sums = ", ".join(f"SUM({measure.expr})" for measure in report.measures)
+        return f'SELECT {report.day}, {dims}, {sums} FROM "{report.table}"'
+
+    def _group(self) -> str:
+        return f" GROUP BY 1, {', '.join(str(idx + 2) for idx in range(len(self.report.dimensions)))}"
+
+    def load(self, db: sqlite3.Connection) -> None:
+        # The one full GROUP BY; everything after is maintained from writes.
+        width = len(self.report.dimensions)
+        for row in db.execute(self._select() + self._group()):
+            if row[0]:
+                self.add(row[0], tuple(row[1:1 + width]), row[1 + width:])
+
+    def facts(self, db: sqlite3.Connection, rowids: list[int]) -> list[tuple]:
+        # The touched rows' contribution, pre-grouped like the cube.
+        if not rowids:
+            return []
+        width = len(self.report.dimensions)
+        rows = db.execute(
+            self._select() + " WHERE rowid IN (SELECT value FROM json_each(?))" + self._group(),
+            [json.dumps(rowids)],
+        )
+        return [(row[0], tuple(row[1:1 + width]), tuple(row[1 + width:])) for row in rows if row[0]]
+
+    def query(self, start: str | None = None, end: str | None = None, filters: dict | None = None,
+              group_by: str | None = None) -> dict:
+        # Rolls the cube up once and fills the table and both chart series
+        # from that same pass.
+        report = self.report
+        names = list(report.dimensions)
+        wanted = [(names.index(name), set(values)) for name, values in (filters or {}).items() if values and name in names]
+        group_by = group_by or report.group_by
+        if group_by not in names:
+            raise ValueError(f"Cannot group {report.page} by {group_by}; expected one of {', '.join(names)}")
+        group_idx = names.index(group_by)
+        width = len(report.measures)
+        groups: dict[str, list[float]] = {}
+        series: dict[str, list[float]] = {}
+        lo = bisect.bisect_left(self.days, start) if start else 0
+        hi = bisect.bisect_right(self.days, end) if end else len(self.days)
+        for day in self.days[lo:hi]:
+            day_totals = None
+            for dims, values in self.cells[day].items():
+                if any(dims[idx] not in allowed for idx, allowed in wanted):
+                    continue
+                group = groups.setdefault(dims[group_idx], [0.0] * width)
+                day_totals = day_totals or series.setdefault(day, [0.0] * width)
+                for idx, value in enumerate(values):
+                    group[idx] += value
+                    day_totals[idx] += value
+        measure_names = [measure.name for measure in report.measures]
+        rows = [
+            report.row(key, dict(zip(measure_names, totals)))
+            for key, totals in sorted(groups.items(), key=lambda item: (-item[1][0], str(item[0])))
+        ]
+        labels = sorted(series)
+        charts = []
+        for chart in report.charts:
+            num = measure_names.index(chart.numerator)
+            den = measure_names.index(chart.denominator) if chart.denominator else None
+            charts.append({
+                "labels": labels,
+                chart.name: [
+                    _ratio(series[day][num], series[day][den], chart.scale) if den is not None else series[day][num]
+                    for day in labels
+                ],
+            })
+        return {"rows": rows, "charts": charts}
+
+
+class ReportCubes:
+    def __init__(self, reports=None):
+        self.cubes = {page: Cube(report) for page, report in (reports or REPORTS).items()}
+        self._lock = threading.Lock()
+
+    def start(self, db: sqlite3.Connection) -> None:
+        for cube in self.cubes.values():
+            cube.load(db)
+
+    def contributions(self, db: sqlite3.Connection, table: str, rowids: list[int]) -> dict[str, list[tuple]]:
+        return {page: cube.facts(db, rowids) for page, cube in self.cubes.items() if cube.report.table == table}
+
+    def apply(self, before: dict, after: dict) -> None:
+        with self._lock:
+            for page, facts in before.items():
+                for day, dims, values in facts:
+                    self.cubes[page].add(day, dims, values, -1)
+            for page, facts in after.items():
+                for day, dims, values in facts:
+                    self.cubes[page].add(day, dims, values)
+
+    def query(self, page: str, params: dict) -> dict:
+        # params as sent by the report page: from/to (or a "date_range" text
+        # holding two dates), one comma-separated list per dimension, and an
+        # optional group_by.
+        cube = self.cubes[page]
+        dates = DAY.findall(params.get("date_range") or "")
+        start = params.get("from") or (dates[0] if dates else None)
+        end = params.get("to") or (dates[1] if len(dates) > 1 else None)
+        filters = {
+            name: [value.strip() for value in params[name].split(",") if value.strip()]
+            for name in cube.report.dimensions if params.get(name)
+        }
+        started = time.perf_counter()
+        with self._lock:
+            result = cube.query(start, end, filters, params.get("group_by"))
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
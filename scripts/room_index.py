@@ -0,0 +1,309 @@
+from __future__ import annotations
+import csv
+import random
+import sqlite3
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class Room:
+    building: str
+    number: str
+    floor: int
+    capacity: int
+    blocked: bool = False
+
+    @property
+    def key(self) -> str:
+        return f"{self.building}-{self.number}"
+
+
+@dataclass(frozen=True)
+class Stay:
+    room: str
+    arrive: date
+    depart: date
+    pax: int
+    gender: str
+    ref: str = ""
+
+    @property
+    def sort_key(self) -> tuple:
+        return (self.arrive, self.depart, self.ref, self.pax, self.gender)
+
+
+class _Node:
+    __slots__ = ("key", "stay", "priority", "left", "right", "max_end")
+
+    def __init__(self, stay: Stay, priority: float):
+        self.key = stay.sort_key
+        self.stay = stay
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.max_end = stay.depart
+
+
+def _update(node: _Node) -> _Node:
+    node.max_end = node.stay.depart
+    if node.left is not None and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+    return node
+
+
+def _split(node, key):
+    # Returns (< key, >= key).
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return _update(node), right
+    left, node.left = _split(node.left, key)
+    return left, _update(node)
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+
+class IntervalTree:
+    # Treap ordered by arrival and augmented with the latest departure in each
+    # subtree: insert, delete and overlap queries are O(log n) expected
+    # (plus the number of stays reported).
+    def __init__(self, stays=()):
+        self.root = None
+        self.size = 0
+        self._random = random.Random(0x5EED)
+        self.bulk_load(stays)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        stack, node = [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.stay
+            node = node.right
+
+    def bulk_load(self, stays) -> None:
+        stays = sorted(list(self) + list(stays), key=lambda stay: stay.sort_key)
+        # Cartesian tree over the sorted stays with fresh random priorities,
+        # built in O(n) with a right-spine stack.
+        spine: list[_Node] = []
+        for stay in stays:
+            node = _Node(stay, self._random.random())
+            last = None
+            while spine and spine[-1].priority < node.priority:
+                last = _update(spine.pop())
+            node.left = last
+            if spine:
+                spine[-1].right = node
+            spine.append(node)
+        while spine:
+            top = _update(spine.pop())
+            if not spine:
+                self.root = top
+        if not stays:
+            self.root = None
+        self.size = len(stays)
+
+    def insert(self, stay: Stay) -> None:
+        node = _Node(stay, self._random.random())
+        left, right = _split(self.root, node.key)
+        self.root = _merge(_merge(left, node), right)
+        self.size += 1
+
+    def delete(self, stay: Stay) -> bool:
+        key = stay.sort_key
+        left, rest = _split(self.root, key)
+        # `match` holds every node with exactly this key; duplicates beyond the
+        # first are merged back in.
+        match, right = _split(rest, (*key, 1)) if rest is not None else (None, None)
+        removed = False
+        if match is not None:
+            removed = True
+            match = _merge(match.left, match.right)
+            self.size -= 1
+        self.root = _merge(_merge(left, match), right)
+        return removed
+
+    def overlapping(self, arrive: date, depart: date) -> list[Stay]:
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None or node.max_end <= arrive:
+                continue
+            stack.append(node.left)
+            if node.stay.arrive < depart:
+                if node.stay.depart > arrive:
+                    found.append(node.stay)
+                stack.append(node.right)
+        return found
+
+    def any_overlap(self, arrive: date, depart: date) -> bool:
+        node = self.root
+        while node is not None:
+            if node.stay.arrive < depart and node.stay.depart > arrive:
+                return True
+            if node.left is not None and node.left.max_end > arrive:
+                node = node.left
+            elif node.stay.arrive < depart:
+                node = node.right
+            else:
+                return False
+        return False
+
+
+def peak_occupancy(stays: list[Stay]) -> int:
+    events = sorted([(stay.arrive, stay.pax) for stay in stays] + [(stay.depart, -stay.pax) for stay in stays])
+    peak = current = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+class RoomIndex:
+    def __init__(self, rooms, stays=()):
+        self.rooms = {room.key: room for room in rooms}
+        self.trees = {key: IntervalTree() for key in self.rooms}
+        grouped: dict[str, list[Stay]] = {}
+        for stay in stays:
+            grouped.setdefault(stay.room, []).append(stay)
+        for key, room_stays in grouped.items():
+            self.trees[key].bulk_load(room_stays)
+
+    @classmethod
+    def from_csv(cls, rooms_path: Path, stays_path: Path) -> RoomIndex:
+        return cls(load_rooms_csv(rooms_path), load_stays_csv(stays_path))
+
+    @classmethod
+    def from_sqlite(cls, path: Path, rooms_table: str = "rooms", stays_table: str = "room_stays") -> RoomIndex:
+        return cls(load_rooms_sqlite(path, rooms_table), load_stays_sqlite(path, stays_table))
+
+    def __len__(self) -> int:
+        return sum(len(tree) for tree in self.trees.values())
+
+    def add(self, stay: Stay) -> None:
+        self.trees[stay.room].insert(stay)
+
+    def remove(self, stay: Stay) -> bool:
+        return self.trees[stay.room].delete(stay)
+
+    def overlapping(self, room: str, arrive: date, depart: date) -> list[Stay]:
+        return self.trees[room].overlapping(arrive, depart)
+
+    def free_beds(self, room: str, arrive: date, depart: date, gender: str) -> int:
+        info = self.rooms[room]
+        if info.blocked:
+            return 0
+        stays = self.trees[room].overlapping(arrive, depart)
+        if any(stay.gender != gender for stay in stays):
+            return 0
+        return info.capacity - peak_occupancy(stays)
+
+    def free_rooms(self, arrive: date, depart: date) -> list[str]:
+        return [
+            key for key, room in self.rooms.items()
+            if not room.blocked and not self.trees[key].any_overlap(arrive, depart)
+        ]
+
+    def over_capacity(self, arrive: date, depart: date) -> list[tuple[str, int, int]]:
+        alerts = []
+        for key, tree in self.trees.items():
+            stays = tree.overlapping(arrive, depart)
+            if stays:
+                peak = peak_occupancy(stays)
+                if peak > self.rooms[key].capacity:
+                    alerts.append((key, peak, self.rooms[key].capacity))
+        return alerts
+
+    def conflicts(self, arrive: date, depart: date) -> list[tuple[str, list[Stay]]]:
+        found = []
+        for key, tree in self.trees.items():
+            stays = tree.overlapping(arrive, depart)
+            if len({stay.gender for stay in stays}) > 1 or (stays and self.rooms[key].blocked):
+                found.append((key, stays))
+        return found
+
+    def kpis(self, day: date, next_day: date) -> dict[str, int]:
+        # Card values for accommodation-grid-layout.html and the allocation
+        # page alerts, for the night of `day`.
+        occupied = sum(
+            1 for key, tree in self.trees.items()
+            if not self.rooms[key].blocked and tree.any_overlap(day, next_day)
+        )
+        blocked = sum(1 for room in self.rooms.values() if room.blocked)
+        return {
+            "Total rooms": len(self.rooms),
+            "Rooms occupied": occupied,
+            "Rooms free": len(self.rooms) - occupied - blocked,
+            "Blocked": blocked,
+            "Over-capacity alerts": len(self.over_capacity(day, next_day)),
+            "Conflicts": len(self.conflicts(day, next_day)),
+        }
+
+
+def _parse_room(row) -> Room:
+    return Room(
+        building=row["building"],
+        number=str(row["number"]),
+        floor=int(row["floor"]),
+        capacity=int(row["capacity"]),
+        blocked=str(row["blocked"] or "").strip().lower() in ("1", "true", "yes"),
+    )
+
+
+def _parse_stay(row) -> Stay:
+    return Stay(
+        room=row["room"],
+        arrive=date.fromisoformat(row["arrive"]),
+        depart=date.fromisoformat(row["depart"]),
+        pax=int(row["pax"]),
+        gender=row["gender"],
+        ref=row["ref"] or "",
+    )
+
+
+def load_rooms_csv(path: Path) -> list[Room]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [_parse_room(row) for row in csv.DictReader(handle, restval="")]
+
+
+def load_stays_csv(path: Path) -> list[Stay]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [_parse_stay(row) for row in csv.DictReader(handle)]
+
+
+def _query_sqlite(path: Path, sql: str, parse) -> list:
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    try:
+        return [parse(row) for row in connection.execute(sql)]
+    finally:
+        connection.close()
+
+
+def load_rooms_sqlite(path: Path, table: str = "rooms") -> list[Room]:
+    return _query_sqlite(path, f'SELECT building, number, floor, capacity, blocked FROM "{table}"', _parse_room)
+
+
+def load_stays_sqlite(path: Path, table: str = "room_stays") -> list[Stay]:
+    return _query_sqlite(path, f'SELECT room, arrive, depart, pax, gender, ref FROM "{table}"', _parse_stay)
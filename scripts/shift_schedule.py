@@ -0,0 +1,216 @@
+from __future__ import annotations
+import csv
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+SHIFTS = ("M", "E", "N")
+SHIFT_HOURS = {"M": 8, "E": 8, "N": 8}
+# Shift pairs on consecutive days that leave less than 11 hours of rest.
+SHORT_REST = {("E", "M"), ("N", "M"), ("N", "E")}
+STANDARD_HOURS = 40
+OVERTIME_CAP = 8
+OFF = "Off"
+LEAVE = "Leave"
+
+
+@dataclass(frozen=True)
+class Employee:
+    code: str
+    name: str
+    department: str
+    role: str
+    max_overtime: int = OVERTIME_CAP
+
+
+@dataclass(frozen=True)
+class Requirement:
+    day: date
+    department: str
+    role: str
+    shift: str
+    count: int
+
+
+@dataclass(frozen=True)
+class Leave:
+    employee: str
+    start: date
+    end: date
+    status: str = "Approved"
+    kind: str = "Annual"
+
+    def covers(self, day: date) -> bool:
+        return self.start <= day <= self.end
+
+
+@dataclass(frozen=True)
+class ShiftConflict:
+    day: date
+    department: str
+    role: str
+    shift: str
+    reason: str
+
+
+@dataclass
+class _Pool:
+    # Staff sharing a department and role; each pool is solved on its own, so
+    # a change to one person only re-solves the pool they belong to.
+    employees: list[Employee]
+    slots: dict[tuple[date, str], int] = field(default_factory=dict)
+    assigned: dict[tuple[date, str], set[str]] = field(default_factory=dict)
+
+
+class Schedule:
+    def __init__(self, employees, requirements, leave=(), days=None):
+        self.employees = {employee.code: employee for employee in employees}
+        self.pools: dict[tuple[str, str], _Pool] = {}
+        for employee in self.employees.values():
+            self.pools.setdefault((employee.department, employee.role), _Pool([])).employees.append(employee)
+        for req in requirements:
+            pool = self.pools.setdefault((req.department, req.role), _Pool([]))
+            pool.slots[(req.day, req.shift)] = pool.slots.get((req.day, req.shift), 0) + req.count
+        self.days = sorted(days or {day for pool in self.pools.values() for day, _ in pool.slots})
+        self.leave: dict[str, set[date]] = {}
+        for item in leave:
+            if item.status == "Approved":
+                self.leave.setdefault(item.employee, set()).update(day for day in self.days if item.covers(day))
+        # code -> day -> shift, and code -> hours, kept in step with pool.assigned.
+        self.shifts: dict[str, dict[date, str]] = {code: {} for code in self.employees}
+        self.hours: dict[str, int] = dict.fromkeys(self.employees, 0)
+        for key in self.pools:
+            self._solve_pool(key)
+
+    def _can_work(self, employee: Employee, day: date, shift: str) -> bool:
+        worked = self.shifts[employee.code]
+        if day in worked or day in self.leave.get(employee.code, ()):
+            return False
+        if self.hours[employee.code] + SHIFT_HOURS[shift] > STANDARD_HOURS + employee.max_overtime:
+            return False
+        before = worked.get(day - timedelta(days=1))
+        after = worked.get(day + timedelta(days=1))
+        return (before, shift) not in SHORT_REST and (shift, after) not in SHORT_REST
+
+    def _assign(self, pool: _Pool, employee: Employee, day: date, shift: str) -> None:
+        pool.assigned.setdefault((day, shift), set()).add(employee.code)
+        self.shifts[employee.code][day] = shift
+        self.hours[employee.code] += SHIFT_HOURS[shift]
+
+    def _unassign(self, pool: _Pool, code: str, day: date) -> None:
+        shift = self.shifts[code].pop(day)
+        pool.assigned[(day, shift)].discard(code)
+        self.hours[code] -= SHIFT_HOURS[shift]
+
+    def _fill(self, pool: _Pool, day: date, shift: str) -> None:
+        missing = pool.slots.get((day, shift), 0) - len(pool.assigned.get((day, shift), ()))
+        if missing <= 0:
+            return
+        # Fewest hours first keeps the week balanced and overtime as a last resort.
+        candidates = sorted(
+            (employee for employee in pool.employees if self._can_work(employee, day, shift)),
+            key=lambda employee: (self.hours[employee.code], employee.code),
+        )
+        for employee in candidates[:missing]:
+            self._assign(pool, employee, day, shift)
+
+    def _solve_pool(self, key: tuple[str, str]) -> None:
+        pool = self.pools[key]
+        for day in self.days:
+            # Nights first: they constrain the following day the most.
+            for shift in reversed(SHIFTS):
+                self._fill(pool, day, shift)
+
+    def set_leave(self, code: str, leave) -> None:
+        # Incremental re-solve when one person's approved leave changes: drop
+        # their shifts on new leave days, refill those slots from the pool, and
+        # offer their freed-up days to any slot still short.
+        employee = self.employees[code]
+        pool = self.pools[(employee.department, employee.role)]
+        days = {day for item in leave if item.status == "Approved" for day in self.days if item.covers(day)}
+        self.leave[code] = days
+        vacated = [(day, self.shifts[code][day]) for day in sorted(days) if day in self.shifts[code]]
+        for day, _ in vacated:
+            self._unassign(pool, code, day)
+        for day, shift in vacated:
+            self._fill(pool, day, shift)
+        for day in self.days:
+            for shift in reversed(SHIFTS):
+                self._fill(pool, day, shift)
+
+    def conflicts(self) -> list[ShiftConflict]:
+        found = []
+        for (department, role), pool in self.pools.items():
+            for (day, shift), required in sorted(pool.slots.items()):
+                assigned = len(pool.assigned.get((day, shift), ()))
+                if assigned < required:
+                    found.append(ShiftConflict(day, department, role, shift, f"Short by {required - assigned}"))
+        return found
+
+    def overtime(self) -> dict[str, int]:
+        return {code: hours - STANDARD_HOURS for code, hours in self.hours.items() if hours > STANDARD_HOURS}
+
+    def grid_rows(self) -> list[list[str]]:
+        rows = []
+        for employee in sorted(self.employees.values(), key=lambda employee: employee.name):
+            worked = self.shifts[employee.code]
+            leave = self.leave.get(employee.code, ())
+            rows.append([employee.name] + [
+                worked.get(day) or (LEAVE if day in leave else OFF) for day in self.days
+            ])
+        return rows
+
+    def day_summary(self) -> list[str]:
+        required = dict.fromkeys(self.days, 0)
+        assigned = dict.fromkeys(self.days, 0)
+        for pool in self.pools.values():
+            for (day, _), count in pool.slots.items():
+                required[day] += count
+            for (day, _), codes in pool.assigned.items():
+                assigned[day] += len(codes)
+        return [f"{day:%a}: Required {required[day]} / Assigned {assigned[day]}" for day in self.days]
+
+    def kpis(self, open_requests: int = 0) -> dict[str, int]:
+        # Card values for hr-scheduling.html.
+        return {
+            "Shifts published": sum(len(worked) for worked in self.shifts.values()),
+            "Conflicts": len(self.conflicts()),
+            "Overtime risk": len(self.overtime()),
+            "Open requests": open_requests,
+        }
+
+
+def load_employees_csv(path: Path) -> list[Employee]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Employee(
+                code=row["code"],
+                name=row["name"],
+                department=row["department"],
+                role=row["role"],
+                max_overtime=int(row.get("max_overtime") or OVERTIME_CAP),
+            )
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_requirements_csv(path: Path) -> list[Requirement]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Requirement(date.fromisoformat(row["day"]), row["department"], row["role"], row["shift"], int(row["count"]))
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_leave_csv(path: Path) -> list[Leave]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Leave(
+                row["employee"],
+                date.fromisoformat(row["start"]),
+                date.fromisoformat(row["end"]),
+                row.get("status") or "Approved",
+                row.get("type") or "Annual",
+            )
+            for row in csv.DictReader(handle)
+        ]
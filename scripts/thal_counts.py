@@ -0,0 +1,230 @@
+from __future__ import annotations
+import csv
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+MEALS = ("Breakfast", "Lunch", "Dinner")
+# Diners sharing one thal.
+THAL_SIZE = 8
+
+
+@dataclass(frozen=True)
+class GroupPresence:
+    sh_no: str
+    group: str
+    pax: int
+    arrive: date
+    depart: date
+    hall: str = "Main"
+
+    @property
+    def thals(self) -> int:
+        return math.ceil(self.pax / THAL_SIZE)
+
+    def meals(self):
+        # Every meal on the nights booked, plus breakfast on departure day.
+        day = self.arrive
+        while day < self.depart:
+            for meal in MEALS:
+                yield day, meal
+            day += timedelta(days=1)
+        if self.depart > self.arrive:
+            yield self.depart, MEALS[0]
+
+
+@dataclass(frozen=True)
+class Recipe:
+    dish: str
+    yield_servings: int
+    ingredients: dict[str, float] = field(default_factory=dict)
+
+    def per_thal(self) -> dict[str, float]:
+        return {item: qty * THAL_SIZE / self.yield_servings for item, qty in self.ingredients.items()}
+
+
+class ThalPipeline:
+    # Keeps thal totals per meal, hall, group and dish, and ingredient needs
+    # per meal, as running sums. Check-ins, check-outs and adjustments apply
+    # the change in one group's net thals to the meals it touches instead of
+    # recomputing the day.
+    def __init__(self, menu: dict[tuple[date, str], list[str]], recipes: dict[str, Recipe]):
+        self.menu = menu
+        self.recipes = recipes
+        self._per_thal = {dish: recipe.per_thal() for dish, recipe in recipes.items()}
+        self.groups: dict[str, GroupPresence] = {}
+        self.extra: dict[tuple[str, date, str], int] = {}
+        self.by_group: dict[tuple[date, str], dict[str, tuple[int, int, int]]] = {}
+        self.by_hall: Counter = Counter()
+        self.by_dish: Counter = Counter()
+        self.ingredients: dict[tuple[date, str], Counter] = {}
+
+    def _explode(self, day: date, meal: str, net: int) -> None:
+        needs = self.ingredients.setdefault((day, meal), Counter())
+        for dish in self.menu.get((day, meal), ()):
+            self.by_dish[(day, meal, dish)] += net
+            for item, qty in self._per_thal.get(dish, {}).items():
+                needs[item] += qty * net
+
+    def _apply(self, presence: GroupPresence, sign: int, only=None, pending: Counter | None = None) -> None:
+        for day, meal in presence.meals():
+            if only is not None and (day, meal) != only:
+                continue
+            extra = self.extra.get((presence.sh_no, day, meal), 0)
+            net = max(presence.thals + extra, 0) * sign
+            rows = self.by_group.setdefault((day, meal), {})
+            if sign > 0:
+                rows[presence.sh_no] = (presence.pax, presence.thals, extra)
+            else:
+                rows.pop(presence.sh_no, None)
+            self.by_hall[(day, meal, presence.hall)] += net
+            if pending is None:
+                self._explode(day, meal, net)
+            else:
+                pending[(day, meal)] += net
+
+    def load(self, presences) -> None:
+        # Initial fill: thals are summed per meal first, so each meal's menu is
+        # exploded into ingredients once rather than once per group.
+        pending: Counter = Counter()
+        for presence in presences:
+            old = self.groups.get(presence.sh_no)
+            if old is not None:
+                self._apply(old, -1, pending=pending)
+            self.groups[presence.sh_no] = presence
+            self._apply(presence, 1, pending=pending)
+        for (day, meal), net in pending.items():
+            self._explode(day, meal, net)
+
+    def upsert(self, presence: GroupPresence) -> None:
+        # A check-in, a changed pax count or changed dates.
+        old = self.groups.get(presence.sh_no)
+        if old is not None:
+            self._apply(old, -1)
+        self.groups[presence.sh_no] = presence
+        self._apply(presence, 1)
+
+    def remove(self, sh_no: str) -> None:
+        old = self.groups.pop(sh_no, None)
+        if old is not None:
+            self._apply(old, -1)
+
+    def adjust(self, sh_no: str, day: date, meal: str, extra: int) -> None:
+        # Extra (or, when negative, cancelled) thals for one group and meal.
+        presence = self.groups.get(sh_no)
+        if presence is not None:
+            self._apply(presence, -1, only=(day, meal))
+        self.extra[(sh_no, day, meal)] = extra
+        if presence is not None:
+            self._apply(presence, 1, only=(day, meal))
+
+    def total(self, day: date, meal: str | None = None) -> int:
+        return sum(
+            thals for (when, served, _), thals in self.by_hall.items()
+            if when == day and (meal is None or served == meal)
+        )
+
+    def group_rows(self, day: date) -> list[list[str]]:
+        # Rows for mawaid-thal-counts.html's "Thal summary" table.
+        rows = []
+        for meal in MEALS:
+            for sh_no, (pax, thals, extra) in sorted(self.by_group.get((day, meal), {}).items()):
+                presence = self.groups[sh_no]
+                rows.append([
+                    f"{presence.group} / {sh_no}",
+                    str(pax),
+                    str(thals),
+                    f"{extra:+d}" if extra else "0",
+                    str(max(thals + extra, 0)),
+                    f"{meal} - {presence.hall}",
+                    "Adjust",
+                ])
+        return rows
+
+    def dish_rows(self, day: date) -> list[list[str]]:
+        # Rows for mawaid-kitchen-operations.html's "Prep plan" table.
+        return [
+            [dish, str(thals), "thals", "Planned", "", meal, "Update"]
+            for meal in MEALS
+            for (when, served, dish), thals in sorted(self.by_dish.items())
+            if when == day and served == meal and thals
+        ]
+
+    def ingredient_totals(self, day: date) -> Counter:
+        totals: Counter = Counter()
+        for meal in MEALS:
+            totals.update(self.ingredients.get((day, meal), {}))
+        return totals
+
+    def kpis(self, day: date) -> dict[str, int]:
+        extras = [
+            extra for (sh_no, when, _), extra in self.extra.items()
+            if when == day and sh_no in self.groups
+        ]
+        served = [(day, meal) for meal in MEALS]
+        return {
+            "Total thals": self.total(day),
+            "Extra thals": sum(extra for extra in extras if extra > 0),
+            "Cancelled thals": -sum(extra for extra in extras if extra < 0),
+            "Total plates": sum(pax for key in served for pax, _, _ in self.by_group.get(key, {}).values()),
+        }
+
+
+def presence_from_stays(stays, groups: dict[str, str] | None = None, halls: dict[str, str] | None = None) -> list[GroupPresence]:
+    # Collapse room stays (room_index.Stay) into one presence per SH No., so
+    # live accommodation occupancy feeds the pipeline directly.
+    merged: dict[str, list] = {}
+    for stay in stays:
+        entry = merged.setdefault(stay.ref, [0, stay.arrive, stay.depart])
+        entry[0] += stay.pax
+        entry[1] = min(entry[1], stay.arrive)
+        entry[2] = max(entry[2], stay.depart)
+    groups = groups or {}
+    halls = halls or {}
+    return [
+        GroupPresence(sh_no, groups.get(sh_no, sh_no), pax, arrive, depart, halls.get(sh_no, "Main"))
+        for sh_no, (pax, arrive, depart) in merged.items()
+    ]
+
+
+def load_presence_csv(path: Path) -> list[GroupPresence]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            GroupPresence(
+                sh_no=row["sh_no"],
+                group=row["group"],
+                pax=int(row["pax"]),
+                arrive=date.fromisoformat(row["arrive"]),
+                depart=date.fromisoformat(row["depart"]),
+                hall=row.get("hall") or "Main",
+            )
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_menu_csv(path: Path) -> dict[tuple[date, str], list[str]]:
+    menu: dict[tuple[date, str], list[str]] = {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            menu.setdefault((date.fromisoformat(row["day"]), row["meal"]), []).append(row["dish"])
+    return menu
+
+
+def load_recipes_csv(path: Path) -> dict[str, Recipe]:
+    # One row per dish ingredient: dish, yield, item, qty.
+    rows: dict[str, tuple[int, dict[str, float]]] = {}
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            _, ingredients = rows.setdefault(row["dish"], (int(row["yield"]), {}))
+            ingredients[row["item"]] = ingredients.get(row["item"], 0.0) + float(row["qty"])
+    return {dish: Recipe(dish, servings, ingredients) for dish, (servings, ingredients) in rows.items()}
+
+
+def load_adjustments_csv(path: Path) -> list[tuple[str, date, str, int]]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            (row["sh_no"], date.fromisoformat(row["day"]), row["meal"], int(row["extra"]))
+            for row in csv.DictReader(handle)
+        ]
@@ -0,0 +1,287 @@
+from __future__ import annotations
+import bisect
+import csv
+import heapq
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+MIN_TURNAROUND = timedelta(minutes=15)
+MAX_CONTINUOUS = timedelta(hours=4, minutes=30)
+BREAK = timedelta(minutes=45)
+
+
+@dataclass(frozen=True)
+class Driver:
+    code: str
+    name: str
+    licence_expiry: date
+    max_shift: timedelta = timedelta(hours=10)
+
+
+@dataclass(frozen=True)
+class Vehicle:
+    vehicle_id: str
+    kind: str
+    seats: int
+    service_due: date | None = None
+    blocked: bool = False
+
+    def available_on(self, day: date) -> bool:
+        return not self.blocked and (self.service_due is None or self.service_due > day)
+
+
+@dataclass(frozen=True)
+class Trip:
+    trip_id: str
+    journey: str
+    route: str
+    start: datetime
+    end: datetime
+    pax: int
+    vehicle_kind: str = ""
+    driver: str = ""
+    vehicle: str = ""
+
+
+@dataclass(frozen=True)
+class Assignment:
+    trip: Trip
+    driver: str
+    vehicle: str
+
+
+@dataclass(frozen=True)
+class RosterConflict:
+    trip_id: str
+    resource: str
+    reason: str
+
+
+@dataclass
+class RosterResult:
+    assignments: list[Assignment] = field(default_factory=list)
+    conflicts: list[RosterConflict] = field(default_factory=list)
+
+
+@dataclass
+class _DriverState:
+    driver: Driver
+    duty_start: datetime | None = None
+    continuous_since: datetime | None = None
+    free_at: datetime | None = None
+    # Pinned trips later in the day, as sorted (start, end) windows.
+    pinned: list[tuple[datetime, datetime]] = field(default_factory=list)
+
+    def can_take(self, trip: Trip) -> bool:
+        if self.driver.licence_expiry < trip.start.date():
+            return False
+        if self.duty_start is not None and trip.end - self.duty_start > self.driver.max_shift:
+            return False
+        if self.free_at is not None:
+            gap = trip.start - self.free_at
+            if gap < MIN_TURNAROUND:
+                return False
+            continuous_from = trip.start if gap >= BREAK else self.continuous_since
+            if trip.end - continuous_from > MAX_CONTINUOUS:
+                return False
+        return not _overlaps_pinned(self.pinned, trip.start, trip.end + MIN_TURNAROUND)
+
+    def take(self, trip: Trip) -> None:
+        if self.duty_start is None:
+            self.duty_start = trip.start
+        if self.free_at is None or trip.start - self.free_at >= BREAK:
+            self.continuous_since = trip.start
+        self.free_at = max(self.free_at or trip.end, trip.end)
+
+
+def _overlaps_pinned(pinned: list[tuple[datetime, datetime]], start: datetime, end: datetime) -> bool:
+    idx = bisect.bisect_left(pinned, (end,))
+    return any(window_end > start for _, window_end in pinned[max(0, idx - 1):idx])
+
+
+def detect_conflicts(assignments: list[Assignment], turnaround: timedelta = MIN_TURNAROUND) -> list[RosterConflict]:
+    # Sweep over start/end events in time order; a resource that starts a trip
+    # while still active (including turnaround) is double-booked.
+    events = []
+    for item in assignments:
+        for kind, resource in (("Driver", item.driver), ("Vehicle", item.vehicle)):
+            if resource:
+                events.append((item.trip.end + turnaround, 0, kind, resource, item.trip.trip_id))
+                events.append((item.trip.start, 1, kind, resource, item.trip.trip_id))
+    events.sort()
+    active: dict[tuple[str, str], str] = {}
+    conflicts = []
+    for _, is_start, kind, resource, trip_id in events:
+        key = (kind, resource)
+        if not is_start:
+            if active.get(key) == trip_id:
+                del active[key]
+            continue
+        if key in active:
+            conflicts.append(RosterConflict(trip_id, resource, f"{kind} already on trip {active[key]}"))
+        active[key] = trip_id
+    return conflicts
+
+
+def solve(trips, drivers, vehicles) -> RosterResult:
+    trips = sorted(trips, key=lambda trip: (trip.start, trip.end, trip.trip_id))
+    states = {driver.code: _DriverState(driver) for driver in drivers}
+    fleet = {vehicle.vehicle_id: vehicle for vehicle in vehicles}
+    result = RosterResult()
+
+    pinned = [trip for trip in trips if trip.driver and trip.vehicle]
+    for trip in pinned:
+        if trip.driver in states:
+            bisect.insort(states[trip.driver].pinned, (trip.start, trip.end))
+    pinned_assignments = [Assignment(trip, trip.driver, trip.vehicle) for trip in pinned]
+    result.conflicts.extend(detect_conflicts(pinned_assignments))
+    for item in pinned_assignments:
+        vehicle = fleet.get(item.vehicle)
+        if vehicle is not None and not vehicle.available_on(item.trip.start.date()):
+            result.conflicts.append(RosterConflict(item.trip.trip_id, item.vehicle, "Vehicle blocked or due service"))
+        state = states.get(item.driver)
+        if state is not None and state.driver.licence_expiry < item.trip.start.date():
+            result.conflicts.append(RosterConflict(item.trip.trip_id, item.driver, "Driver licence expired"))
+
+    # Resources become idle again once their current trip and turnaround are
+    # over; the heaps hold (free_at, id) so each trip only pops what is ready.
+    busy_drivers: list[tuple[datetime, str]] = []
+    busy_vehicles: list[tuple[datetime, str]] = []
+    idle_drivers = set(states)
+    idle_vehicles = set(fleet)
+    vehicle_pins: dict[str, list[tuple[datetime, datetime]]] = {}
+    for trip in pinned:
+        bisect.insort(vehicle_pins.setdefault(trip.vehicle, []), (trip.start, trip.end))
+
+    vehicle_free_at: dict[str, datetime] = {}
+    for trip in trips:
+        while busy_drivers and busy_drivers[0][0] <= trip.start:
+            code = heapq.heappop(busy_drivers)[1]
+            if states[code].free_at + MIN_TURNAROUND <= trip.start:
+                idle_drivers.add(code)
+        while busy_vehicles and busy_vehicles[0][0] <= trip.start:
+            vid = heapq.heappop(busy_vehicles)[1]
+            if vehicle_free_at[vid] + MIN_TURNAROUND <= trip.start:
+                idle_vehicles.add(vid)
+
+        if trip.driver and trip.vehicle:
+            # Pinned trip: already checked above, only book the resources.
+            driver_code = trip.driver if trip.driver in states else None
+            vehicle_id = trip.vehicle if trip.vehicle in fleet else None
+        else:
+            driver_code, vehicle_id = _pick(trip, states, idle_drivers, fleet, idle_vehicles, vehicle_pins, result)
+            if driver_code is None or vehicle_id is None:
+                continue
+        if driver_code is not None:
+            states[driver_code].take(trip)
+            idle_drivers.discard(driver_code)
+            heapq.heappush(busy_drivers, (trip.end + MIN_TURNAROUND, driver_code))
+        if vehicle_id is not None:
+            vehicle_free_at[vehicle_id] = max(vehicle_free_at.get(vehicle_id, trip.end), trip.end)
+            idle_vehicles.discard(vehicle_id)
+            heapq.heappush(busy_vehicles, (trip.end + MIN_TURNAROUND, vehicle_id))
+        result.assignments.append(Assignment(trip, driver_code or trip.driver, vehicle_id or trip.vehicle))
+    return result
+
+
+def _pick(trip, states, idle_drivers, fleet, idle_vehicles, vehicle_pins, result) -> tuple[str | None, str | None]:
+    driver_code = trip.driver if trip.driver in idle_drivers and states[trip.driver].can_take(trip) else None
+    if driver_code is None and not trip.driver:
+        # Least-loaded eligible driver first, so duty spreads across the pool.
+        candidates = [code for code in idle_drivers if states[code].can_take(trip)]
+        if candidates:
+            driver_code = min(candidates, key=lambda code: (states[code].duty_start is not None, states[code].duty_start or trip.start, code))
+    vehicle_id = trip.vehicle if trip.vehicle in idle_vehicles else None
+    if vehicle_id is None and not trip.vehicle:
+        day = trip.start.date()
+        candidates = [
+            vid for vid in idle_vehicles
+            if fleet[vid].available_on(day)
+            and fleet[vid].seats >= trip.pax
+            and (not trip.vehicle_kind or fleet[vid].kind == trip.vehicle_kind)
+            and not _overlaps_pinned(vehicle_pins.get(vid, []), trip.start, trip.end + MIN_TURNAROUND)
+        ]
+        if candidates:
+            vehicle_id = min(candidates, key=lambda vid: (fleet[vid].seats, vid))
+
+    if driver_code is None:
+        result.conflicts.append(RosterConflict(trip.trip_id, trip.driver or "driver", "No eligible driver available"))
+    if vehicle_id is None:
+        result.conflicts.append(RosterConflict(trip.trip_id, trip.vehicle or "vehicle", "No eligible vehicle available"))
+    return driver_code, vehicle_id
+
+
+def roster_rows(result: RosterResult, drivers) -> list[list[str]]:
+    names = {driver.code: driver.name for driver in drivers}
+    return [
+        [
+            names.get(item.driver, item.driver),
+            item.trip.trip_id,
+            item.trip.journey,
+            f"{item.trip.start:%H:%M} - {item.trip.end:%H:%M}",
+            item.vehicle,
+        ]
+        for item in sorted(result.assignments, key=lambda item: (names.get(item.driver, item.driver), item.trip.start))
+    ]
+
+
+def roster_kpis(result: RosterResult, vehicles, today: date | None = None) -> dict[str, int]:
+    # Card values for transport-roster.html.
+    days = {item.trip.start.date() for item in result.assignments}
+    day = min(days) if days else today or date.today()
+    return {
+        "Trips today": len(result.assignments),
+        "Drivers on duty": len({item.driver for item in result.assignments}),
+        "Vehicles available": sum(1 for vehicle in vehicles if vehicle.available_on(day)),
+        "Conflicts": len(result.conflicts),
+    }
+
+
+def _optional_date(value: str) -> date | None:
+    return date.fromisoformat(value) if value else None
+
+
+def load_drivers_csv(path: Path) -> list[Driver]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Driver(
+                code=row["code"],
+                name=row["name"],
+                licence_expiry=date.fromisoformat(row["licence_expiry"]),
+                max_shift=timedelta(minutes=int(row.get("max_shift_minutes") or 600)),
+            )
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_vehicles_csv(path: Path) -> list[Vehicle]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Vehicle(
+                vehicle_id=row["vehicle_id"],
+                kind=row["kind"],
+                seats=int(row["seats"]),
+                service_due=_optional_date(row.get("service_due") or ""),
+                blocked=(row.get("blocked") or "").strip().lower() in ("1", "true", "yes"),
+            )
+            for row in csv.DictReader(handle)
+        ]
+
+
+def load_trips_csv(path: Path) -> list[Trip]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Trip(
+                trip_id=row["trip_id"],
+                journey=row["journey"],
+                route=row["route"],
+                start=datetime.fromisoformat(row["start"]),
+                end=datetime.fromisoformat(row["end"]),
+                pax=int(row["pax"]),
+                vehicle_kind=row.get("vehicle_kind") or "",
+                driver=row.get("driver") or "",
+                vehicle=row.get("vehicle") or "",
+            )
+            for row in csv.DictReader(handle)
+        ]
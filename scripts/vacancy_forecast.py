@@ -0,0 +1,129 @@
+from __future__ import annotations
+import csv
+import math
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, timedelta
+from itertools import accumulate
+from pathlib import Path
+
+HORIZON_DAYS = 180
+HIGH_RISK = 0.95
+MEDIUM_RISK = 0.85
+UNDER_CAPACITY = 0.40
+
+
+@dataclass(frozen=True)
+class Reservation:
+    arrive: date
+    depart: date
+    pax: int
+
+
+@dataclass(frozen=True)
+class DayForecast:
+    day: date
+    rooms_available: int
+    rooms_reserved: int
+    arrivals: int
+    departures: int
+    occupancy: float
+    risk: str
+
+
+def risk_label(occupancy: float) -> str:
+    if occupancy > HIGH_RISK:
+        return "High"
+    if occupancy >= MEDIUM_RISK:
+        return "Medium"
+    if occupancy < UNDER_CAPACITY:
+        return "Under capacity"
+    return "Low"
+
+
+def _series(counter: Counter, horizon: int) -> list[int]:
+    return [counter.get(offset, 0) for offset in range(horizon)]
+
+
+def forecast(reservations, rooms, start: date, horizon: int = HORIZON_DAYS) -> list[DayForecast]:
+    # One pass over the reservations fills difference arrays for reserved rooms
+    # and arrival/departure pax; accumulate() turns them into daily totals
+    # without looping over each stay's days.
+    rooms = list(rooms)
+    open_rooms = [room for room in rooms if not room.blocked]
+    beds_per_room = (sum(room.capacity for room in open_rooms) / len(open_rooms)) if open_rooms else 1
+    starts: Counter = Counter()
+    ends: Counter = Counter()
+    arrivals: Counter = Counter()
+    departures: Counter = Counter()
+    for res in reservations:
+        first = (res.arrive - start).days
+        last = (res.depart - start).days
+        if last <= 0 or first >= horizon or last <= first:
+            continue
+        needed = math.ceil(res.pax / beds_per_room)
+        starts[max(first, 0)] += needed
+        ends[min(last, horizon)] += needed
+        if first >= 0:
+            arrivals[first] += res.pax
+        if last < horizon:
+            departures[last] += res.pax
+    deltas = [a - b for a, b in zip(_series(starts, horizon), _series(ends, horizon))]
+    reserved = list(accumulate(deltas))
+    available = len(open_rooms)
+    days = []
+    for offset, (booked, arriving, leaving) in enumerate(
+        zip(reserved, _series(arrivals, horizon), _series(departures, horizon))
+    ):
+        occupancy = booked / available if available else 1.0
+        days.append(DayForecast(
+            day=start + timedelta(days=offset),
+            rooms_available=available - booked,
+            rooms_reserved=booked,
+            arrivals=arriving,
+            departures=leaving,
+            occupancy=occupancy,
+            risk=risk_label(occupancy),
+        ))
+    return days
+
+
+def summary(days: list[DayForecast], window: int = 14) -> dict[str, str]:
+    # Card values for accommodation-vacancy-forecast.html.
+    head = days[:window]
+    occupancy = sum(day.occupancy for day in head) / len(head) if head else 0.0
+    return {
+        "Forecasted occupancy": f"{occupancy:.0%}",
+        "Expected arrivals": f"{sum(day.arrivals for day in head):,}",
+        "Expected departures": f"{sum(day.departures for day in head):,}",
+        "Overbooking risk days": str(sum(1 for day in head if day.risk == "High")),
+    }
+
+
+def table_rows(days: list[DayForecast]) -> list[list[str]]:
+    return [
+        [
+            day.day.strftime("%b %d"),
+            f"{day.rooms_available:,}",
+            f"{day.rooms_reserved:,}",
+            f"{day.arrivals:,}",
+            f"{day.departures:,}",
+            day.risk,
+        ]
+        for day in days
+    ]
+
+
+def chart_series(days: list[DayForecast]) -> dict:
+    return {
+        "labels": [day.day.isoformat() for day in days],
+        "occupancy": [round(day.occupancy * 100, 1) for day in days],
+    }
+
+
+def load_reservations_csv(path: Path) -> list[Reservation]:
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [
+            Reservation(date.fromisoformat(row["arrive"]), date.fromisoformat(row["depart"]), int(row["pax"]))
+            for row in csv.DictReader(handle)
+        ]
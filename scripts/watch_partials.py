@@ -0,0 +1,161 @@
+from __future__ import annotations
+import importlib
+import json
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import generate_partials
+
+ROOT = generate_partials.ROOT
+SCRIPTS = Path(generate_partials.__file__).resolve().parent
+WATCHED = [Path(generate_partials.__file__).resolve(), ROOT / "partials" / "plan.md"]
+DATA_EXPORTS = (ROOT / "data", "*.csv")
+POLL_INTERVAL = 0.05
+
+RELOAD_SNIPPET = """<script>
+  new EventSource("/__reload").onmessage = function () { location.reload(); };
+</script>
+"""
+
+
+class ReloadHub:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.version = 0
+        self.changed: list[str] = []
+
+    def publish(self, changed: list[str]) -> None:
+        with self.cond:
+            self.version += 1
+            self.changed = changed
+            self.cond.notify_all()
+
+
+class DevHandler(SimpleHTTPRequestHandler):
+    hub: ReloadHub
+
+    def end_headers(self):
+        self.send_header("Cache-Control", "no-store")
+        super().end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/__reload":
+            self.stream_reloads()
+        elif path.endswith(".html") and not path.startswith("/partials/"):
+            self.send_page(path)
+        else:
+            super().do_GET()
+
+    def send_page(self, path: str) -> None:
+        target = Path(self.translate_path(path))
+        if not target.is_file():
+            self.send_error(404)
+            return
+        html = target.read_text(encoding="utf-8")
+        body = html.replace("</body>", RELOAD_SNIPPET + "</body>", 1).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_reloads(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        hub = self.hub
+        seen = hub.version
+        try:
+            while True:
+                with hub.cond:
+                    fired = hub.cond.wait_for(lambda: hub.version != seen, timeout=15)
+                    seen = hub.version
+                    changed = hub.changed
+                message = f"data: {json.dumps(changed)}\n\n" if fired else ": ping\n\n"
+                self.wfile.write(message.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def engine_modules() -> list:
+    # The scripts/ modules the generator's loaders have imported so far, most
+    # recently imported first so a dependency reloads before its importers.
+    modules = [
+        mod for name, mod in sys.modules.items()
+        if name not in ("__main__", "generate_partials", __name__)
+        and getattr(mod, "__file__", None) and Path(mod.__file__).resolve().parent == SCRIPTS
+    ]
+    return modules[::-1]
+
+
+def watched_files() -> list[Path]:
+    directory, pattern = DATA_EXPORTS
+    return WATCHED + [Path(mod.__file__).resolve() for mod in engine_modules()] + sorted(directory.glob(pattern))
+
+
+def snapshot() -> dict:
+    return {path: path.stat().st_mtime_ns for path in watched_files() if path.exists()}
+
+
+def rebuild(module, hashes: dict):
+    for engine in engine_modules():
+        importlib.reload(engine)
+    module = importlib.reload(module)
+    changed = []
+    for spec in module.load_specs():
+        digest = module.spec_hash(spec)
+        if hashes.get(spec['file']) != digest:
+            module.write_page(spec)
+            hashes[spec['file']] = digest
+            changed.append(spec['file'])
+    if changed:
+        module.save_manifest(hashes)
+        if module.HASHED_MANIFEST.exists():
+            module.write_hashed_partials()
+        if module.bundle_enabled():
+            module.build_bundle()
+    return module, changed
+
+
+def watch(port: int = 8000) -> None:
+    module = generate_partials
+    module.build(incremental=True)
+    hashes = module.load_manifest()
+
+    hub = ReloadHub()
+    handler = partial(type("Handler", (DevHandler,), {"hub": hub}), directory=str(ROOT))
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {ROOT} at http://127.0.0.1:{port}/index-spa.html, watching {len(watched_files())} file(s)")
+
+    mtimes = snapshot()
+    try:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            current = snapshot()
+            if current == mtimes:
+                continue
+            mtimes = current
+            started = time.perf_counter()
+            try:
+                module, changed = rebuild(module, hashes)
+            except Exception as exc:
+                print(f"Rebuild failed: {exc!r}")
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            hub.publish(changed)
+            print(f"Rebuilt {len(changed)} page(s) in {elapsed:.1f} ms: {', '.join(changed) or 'no spec changes'}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()